@@ -1,12 +1,13 @@
+import time
+_RUN_START = time.perf_counter()  # início deste rerun (medição de imports e first paint)
+
 import streamlit as st
 import asyncio
+import concurrent.futures
 import json
-import time
 import os
 import sys
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from googlesearch import search
+import threading
 
 st.set_page_config(page_title="WiseIn", page_icon="logo.png", layout="wide")
 
@@ -45,20 +46,34 @@ def log_to_terminal(message):
     sys.stdout.flush()
 
 try:
-    from logic.csp_quiz import QuizCSP
+    from logic.csp_quiz import QuizPlanCache
     from logic.adversarial import InterviewGame
     from logic.metrics import MetricsLogger
-    metrics_logger = MetricsLogger()
+    from logic.llm_client import get_client_manager, is_rate_limit_error, CircuitOpenError, CLOSED
+    from logic.batch_generation import GENERATION_FLIGHT, await_shared, topic_key
+    from logic.question_cache import QuestionBatchCache
+    from logic.question_bank import QuestionBank
+    from logic.question_stream import stream_questions
+    from logic.tracing import traced
+    from logic.intent_router import IntentRouter, LLM_ROUTE_INSTRUCTIONS, QUIZ, INTERVIEW, fold
 except ImportError:
     st.error("Erro: Pasta de lógica não encontrada.")
     st.stop()
 
-OPENROUTER_API_KEY = " " # <--- INSERE A CHAVE AQUI
+_IMPORTS_DONE = time.perf_counter()
+
+@st.cache_resource
+def get_metrics_logger():
+    return MetricsLogger()
+
+metrics_logger = get_metrics_logger()
+
+OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", " ") # <--- INSERE A CHAVE AQUI
 
 CLIENT_CONFIG = {
     "model": "openai/gpt-4o-mini",
     "api_key": OPENROUTER_API_KEY,
-    "base_url": "https://openrouter.ai/api/v1",
+    "base_url": os.environ.get("WISEIN_LLM_BASE_URL", "https://openrouter.ai/api/v1"),
     "model_info": {
         "vision": False, 
         "function_calling": True, 
@@ -68,35 +83,65 @@ CLIENT_CONFIG = {
     }
 }
 
-STATIC_KNOWLEDGE = {
-    101: {"q": "Qual keyword define uma função em Python?", "a": "def", "ok": "Correto!", "nok": "Errado. É 'def'."},
-    102: {"q": "Listas são mutáveis ou imutáveis?", "a": "mutáveis", "ok": "Certo!", "nok": "Errado."},
-    103: {"q": "O que é o GIL?", "a": "global interpreter lock", "ok": "Exato!", "nok": "Global Interpreter Lock."},
-    104: {"q": "Python é compilado estaticamente?", "a": "não", "ok": "Certo.", "nok": "Errado."},
-    105: {"q": "Complete: `___ : try code` ... `except:`", "a": "try", "ok": "Perfeito.", "nok": "É 'try'."},
-    201: {"q": "Serviço Serverless da AWS?", "a": "lambda", "ok": "Correto.", "nok": "É o Lambda."}
-}
+@st.cache_resource
+def start_metrics_exporter():
+    # Exporta /metrics (Prometheus) se WISEIN_METRICS_PORT estiver definido; uma vez por processo
+    port = os.environ.get("WISEIN_METRICS_PORT")
+    if port:
+        metrics_logger.registry.start_http_server(int(port))
+    return port
 
-STATIC_POOL = [
-    {'id': 101, 'topic': 'python', 'level': 'easy', 'type': 'multiple_choice', 'category': 'vocab'},
-    {'id': 102, 'topic': 'python', 'level': 'medium', 'type': 'multiple_choice', 'category': 'vocab'},
-    {'id': 103, 'topic': 'python', 'level': 'hard', 'type': 'multiple_choice', 'category': 'vocab'},
-    {'id': 104, 'topic': 'python', 'level': 'medium', 'type': 'true_false', 'category': 'vocab'},
-    {'id': 105, 'topic': 'python', 'level': 'hard', 'type': 'code_completion', 'category': 'grammar'},
-    {'id': 201, 'topic': 'AWS', 'level': 'hard', 'type': 'multiple_choice', 'category': 'vocab'},
-]
+start_metrics_exporter()
 
-if "DB_PERGUNTAS" not in st.session_state:
-    st.session_state.DB_PERGUNTAS = STATIC_KNOWLEDGE.copy()
-if "POOL_ATUAL" not in st.session_state:
-    st.session_state.POOL_ATUAL = STATIC_POOL.copy()
+@st.cache_resource
+def get_llm_manager():
+    # Um cliente (e pool de ligações) por processo, partilhado entre reruns e sessões
+    manager = get_client_manager(CLIENT_CONFIG)
+    manager.breaker.metrics_logger = metrics_logger
+    metrics_logger.log_circuit_state(manager.breaker.name, manager.breaker.state)
+    return manager
 
+@st.cache_resource
+def get_question_cache():
+    # Lotes gerados sobrevivem a reinícios; repetir um tópico não volta a chamar o modelo
+    return QuestionBatchCache()
 
-async def fetch_new_questions(topic):
-    client = OpenAIChatCompletionClient(**CLIENT_CONFIG)
-    log_to_terminal(f"Tentando gerar perguntas novas sobre '{topic}' via IA...")
-    
-    prompt = f"""
+PROMPT_VERSION = "quiz-v1"  # mudar sempre que o prompt do gerador mudar (invalida a cache)
+ADVERSARIAL_TIME_BUDGET = 0.05  # segundos por decisão do Minimax
+LLM_CALL_TIMEOUT = 20  # segundos por chamada ao modelo (router e gerador)
+GENERATION_STREAM_TIMEOUT = 90  # segundos para o lote completo em streaming
+QUIZ_CANDIDATES = 20  # soluções CSP avaliadas para escolher o quiz mais variado
+INTERVIEW_TURNS = 5  # perguntas por entrevista
+
+@st.cache_resource
+def get_question_bank():
+    # Um banco por processo, partilhado por todas as sessões (só as perguntas geradas são acrescentadas)
+    from logic.static_knowledge import STATIC_POOL, STATIC_KNOWLEDGE
+
+    bank = QuestionBank()
+    bank.seed(STATIC_POOL, STATIC_KNOWLEDGE)
+    return bank
+
+@st.cache_resource
+def get_intent_router():
+    # Decide intenção e tópico sem LLM; o vocabulário acompanha os tópicos do banco
+    return IntentRouter(metrics_logger=metrics_logger)
+
+def route_input(user_input):
+    bank = get_question_bank()
+    bank.maybe_refresh()  # perguntas gravadas por outros processos (outros workers do Streamlit)
+    router = get_intent_router()
+    router.sync_topics(bank.topics(), bank.version)
+    return router.route(user_input)
+
+@st.cache_resource
+def get_plan_cache():
+    # Partilhada por todas as sessões, como o banco: o mesmo (versão, restrições) só é resolvido uma vez
+    return QuizPlanCache(maxsize=256, metrics_logger=metrics_logger)
+
+
+def build_generation_prompt(topic):
+    return f"""
     Create a technical quiz with 5 questions about '{topic}'.
     Return ONLY a raw JSON list. No markdown formatting (no ```json), no intro text.
     
@@ -114,61 +159,188 @@ async def fetch_new_questions(topic):
     }}
     Make sure to include 5 distinct items with IDs starting from 900.
     """
+
+
+@traced()
+async def fetch_new_questions(topic, raise_rate_limit=False):
+    # Um pedido por tópico no processo inteiro: sessões (e lotes de generate_for_topics) partilham a chamada
     try:
-        agent = AssistantAgent(name="Generator", model_client=client)
-        result = await agent.run(task=prompt)
-        
-        content = result.messages[-1].content
-        content = content.replace("```json", "").replace("```", "").strip()
+        return await GENERATION_FLIGHT.do(topic_key(topic), lambda: generate_questions(topic))
+    except Exception as e:
+        if raise_rate_limit and is_rate_limit_error(e):
+            raise
+        log_to_terminal(f"Erro na geração JSON: {e}")
+        return False
+
+
+async def generate_questions(topic):
+    question_cache = get_question_cache()
+    data = question_cache.get(topic, PROMPT_VERSION)
+    if data is not None:
+        log_to_terminal(f"Cache: {len(data)} perguntas de '{topic}' reutilizadas.")
+        return add_generated_questions(topic, data)
+
+    log_to_terminal(f"Tentando gerar perguntas novas sobre '{topic}' via IA...")
+    
+    prompt = build_generation_prompt(topic)
+    start_time = time.time()
+    try:
+        result = await get_llm_manager().run_agent(task=prompt, name="Generator", timeout=LLM_CALL_TIMEOUT)
+    except CircuitOpenError:
+        raise
+    except Exception:
+        metrics_logger.log_llm_call("Generator", time.time() - start_time, False)
+        raise
+    metrics_logger.log_llm_call("Generator", time.time() - start_time, True)
+    
+    content = result.messages[-1].content
+    content = content.replace("```json", "").replace("```", "").strip()
+    
+    start = content.find("[")
+    end = content.rfind("]") + 1
+    if start != -1 and end != -1:
+        content = content[start:end]
         
-        start = content.find("[")
-        end = content.rfind("]") + 1
-        if start != -1 and end != -1:
-            content = content[start:end]
-            
-        data = json.loads(content)
+    data = json.loads(content)
+    question_cache.put(topic, PROMPT_VERSION, data)
+    return add_generated_questions(topic, data)
+
+
+@st.cache_resource
+def get_generation_streams():
+    # Streams de geração em curso por tópico, partilhados pelas sessões: {chave: {"first_ready", "done"}}
+    return {"lock": threading.Lock(), "streams": {}}
+
+
+@traced()
+async def fetch_new_questions_streaming(topic):
+    """Modo streaming: volta assim que a 1ª pergunta está no banco; as restantes continuam a chegar em fundo.
+
+    Sessões que pedem o mesmo tópico ao mesmo tempo partilham o stream (e esperam pela mesma 1ª pergunta).
+    """
+    bank = get_question_bank()
+    question_cache = get_question_cache()
+    data = question_cache.get(topic, PROMPT_VERSION)
+    if data is not None:
+        log_to_terminal(f"Cache: {len(data)} perguntas de '{topic}' reutilizadas.")
+        return add_generated_questions(topic, data, bank)
+
+    key = topic_key(topic)
+    registry = get_generation_streams()
+    with registry["lock"]:
+        stream = registry["streams"].get(key)
+        is_leader = stream is None
+        if is_leader:
+            stream = registry["streams"][key] = {"first_ready": concurrent.futures.Future(),
+                                                 "done": concurrent.futures.Future()}
+    first_ready = stream["first_ready"]
+
+    if is_leader:
+        log_to_terminal(f"A gerar perguntas sobre '{topic}' via IA (streaming)...")
+        manager = get_llm_manager()
+        prompt = build_generation_prompt(topic)
+        start_time = time.time()
+
+        async def run_stream():
+            items = []
+            try:
+                async for item in stream_questions(manager.stream_completion(prompt, timeout=GENERATION_STREAM_TIMEOUT)):
+                    # SQLite (allocate_ids/insert) pode bloquear: fora do loop partilhado por todas as chamadas ao LLM
+                    await asyncio.to_thread(add_generated_questions, topic, [item], bank)
+                    items.append(item)
+                    if not first_ready.done():
+                        first_ready.set_result(True)
+                        log_to_terminal(f"1ª pergunta de '{topic}' pronta em {time.time() - start_time:.2f}s.")
+                metrics_logger.log_llm_call("GeneratorStream", time.time() - start_time, True)
+                if items:
+                    question_cache.put(topic, PROMPT_VERSION, items)
+            except CircuitOpenError:
+                log_to_terminal("Gerador em pausa (circuito aberto).")
+            except Exception as e:
+                metrics_logger.log_llm_call("GeneratorStream", time.time() - start_time, False)
+                log_to_terminal(f"Erro na geração em streaming: {e}")
+            return bool(items)
+
+        async def consume_stream():
+            ok = False
+            try:
+                # Mesma chave do gerador em bloco: um quiz e uma entrevista do mesmo tópico fazem uma só chamada
+                ok = await GENERATION_FLIGHT.do(key, run_stream)
+            except Exception as e:
+                log_to_terminal(f"Erro na geração em streaming: {e}")
+            finally:
+                with registry["lock"]:
+                    registry["streams"].pop(key, None)
+                if not first_ready.done():
+                    first_ready.set_result(bool(ok))
+                stream["done"].set_result(bool(ok))
+
+        # Corre no loop do manager: sobrevive ao fim do asyncio.run desta interação
+        manager.submit(consume_stream())
+    else:
+        log_to_terminal(f"Stream de '{topic}' já em curso: à espera da 1ª pergunta.")
+
+    try:
+        await asyncio.wait_for(await_shared(first_ready), timeout=LLM_CALL_TIMEOUT)
+    except asyncio.TimeoutError:
+        log_to_terminal(f"Timeout à espera da 1ª pergunta de '{topic}'.")
+        return False
+    return first_ready.result()
+
+
+async def wait_for_stream(topic):
+    """Espera pelo fim do stream em curso do tópico (se houver); True se havia um."""
+    registry = get_generation_streams()
+    with registry["lock"]:
+        stream = registry["streams"].get(topic_key(topic))
+    if stream is None:
+        return False
+    try:
+        await asyncio.wait_for(await_shared(stream["done"]), timeout=GENERATION_STREAM_TIMEOUT)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def add_generated_questions(topic, data, bank=None):
+    if bank is None:
+        bank = get_question_bank()
+    # Só perguntas novas recebem IDs: um lote da cache que já está no banco não é regravado (nem muda a versão)
+    data = [item for item in data if not bank.contains(topic, item.get('q', 'Erro no texto'))]
+    if not data:
+        log_to_terminal(f"Perguntas de '{topic}' já estão no banco.")
+        return True
+    new_ids = bank.allocate_ids(len(data))
+    new_questions = []
+    for unique_id, item in zip(new_ids, data):
         
-        new_pool = []
-        for i, item in enumerate(data):
-            
-            unique_id = int(time.time()) + i 
-            
-            q_type = item.get('type', 'multiple_choice')
-            q_level = item.get('level', 'medium')
-            
-            new_pool.append({
-                'id': unique_id, 
-                'topic': topic, 
-                'level': q_level, 
-                'type': q_type, 
-                'category': item.get('category', 'vocab')
-            })
-            
-            st.session_state.DB_PERGUNTAS[unique_id] = {
-                'q': item.get('q', 'Erro no texto'), 
-                'a': item.get('a', ''), 
-                'ok': item.get('ok', 'Correto!'), 
-                'nok': item.get('nok', 'Incorreto.')
-            }
+        q_type = item.get('type', 'multiple_choice')
+        q_level = item.get('level', 'medium')
         
-        st.session_state.POOL_ATUAL.extend(new_pool)
-        log_to_terminal(f"Sucesso! {len(new_pool)} perguntas de '{topic}' adicionadas.")
-        return True
+        new_questions.append({
+            'id': unique_id, 
+            'topic': topic, 
+            'level': q_level, 
+            'type': q_type, 
+            'category': item.get('category', 'vocab'),
+            'q': item.get('q', 'Erro no texto'), 
+            'a': item.get('a', ''), 
+            'ok': item.get('ok', 'Correto!'), 
+            'nok': item.get('nok', 'Incorreto.')
+        })
     
-    except Exception as e:
-        log_to_terminal(f"Erro na geração JSON: {e}")
-        return False
+    new_pool = bank.add_questions(new_questions)
+    log_to_terminal(f"Sucesso! {len(new_pool)} perguntas de '{topic}' adicionadas.")
+    return True
 
 
+@traced()
 async def generate_quiz_plan(topic: str) -> str:
 
     await fetch_new_questions(topic)
     
-    found_topic = False
-    for q in st.session_state.POOL_ATUAL:
-        if topic.lower() in q['topic'].lower():
-            found_topic = True
-            break
+    bank = get_question_bank()
+    found_topic = bank.has_topic(topic)
             
     search_topic = topic if found_topic else 'python'
     
@@ -182,98 +354,265 @@ async def generate_quiz_plan(topic: str) -> str:
         'min_grammar': 0 
     }
     
-    solver = QuizCSP(st.session_state.POOL_ATUAL, constraints)
-    quiz, stats = solver.solve()
+    plan_cache = get_plan_cache()
+    # Versão lida antes do pool: uma escrita entretanto só torna a chave antiga, nunca a mistura com um pool mais velho
+    version = bank.version
+    quiz, stats = plan_cache.get_or_solve(
+        bank.query(topic=search_topic), version, constraints,
+        variant=f"best_of_{QUIZ_CANDIDATES}", solve_fn=lambda solver: solver.best_of(QUIZ_CANDIDATES)
+    )
     
     if quiz: 
-        print(f"\n[METRICAS - CSP (BACKTRACKING)]")
-        print(f"   ├── Status: Sucesso (Restrições Rígidas)")
-        print(f"   ├── Tópico: {search_topic}")
-        print(f"   ├── Espaço de Busca Exploradodo: {stats['steps_explored']} passos")
-        print(f"   └── Tempo de Computação: {stats['time_seconds']:.6f} segundos")
-        print("-" * 50)
+        log_to_terminal(f"CSP: quiz de '{search_topic}' gerado.")
+        if not stats['cache_hit']:
+            # Num hit, stats é o da resolução original: não voltar a contá-la
+            metrics_logger.log_csp_efficiency(stats['time_seconds'], stats['steps_explored'])
         return {"success": True, "data": quiz, "stats": stats, "type": "quiz_plan"}
     
-    solver = QuizCSP(st.session_state.POOL_ATUAL, {'size': 1, 'topic': search_topic})
-    quiz, stats = solver.solve()
+    version = bank.version
+    quiz, stats = plan_cache.get_or_solve(
+        bank.query(topic=search_topic), version, {'size': 1, 'topic': search_topic}
+    )
     if quiz: 
-        print(f"\n[METRICAS - CSP (BACKTRACKING)]")
-        print(f"   ├── Status: Sucesso (Restrições Rígidas)")
-        print(f"   ├── Tópico: {search_topic}")
-        print(f"   ├── Espaço de Busca Exploradodo: {stats['steps_explored']} passos")
-        print(f"   └── Tempo de Computação: {stats['time_seconds']:.6f} segundos")
-        print("-" * 50)
+        log_to_terminal(f"CSP: quiz de '{search_topic}' gerado.")
+        if not stats['cache_hit']:
+            metrics_logger.log_csp_efficiency(stats['time_seconds'], stats['steps_explored'])
         return {"success": True, "data": quiz, "stats": stats, "type": "quiz_plan"}
     
     return {"success": False}
 
-async def next_adversarial_move(topic: str, history: list) -> dict: 
+def topic_pool_key(topic, pool):
+    """Identifica o pool de um tópico: muda quando chegam perguntas novas desse tópico."""
+    return (topic, frozenset(q.id for q in pool))
+
+def interview_topic(bank, topic):
+    """Tópico usado pela entrevista: o pedido, ou o backup 'python' se o banco não o tiver."""
+    return topic if bank.has_topic(topic) else 'python'
+
+def session_game(game_slot, bank, topic, history):
+    """Jogo persistente da sessão: avança com o histórico e reaproveita a busca do turno anterior.
+
+    A chave é o conjunto de IDs do pool do tópico: perguntas novas de outros tópicos (que mudam
+    bank.version) não deitam fora a tabela de transposição.
+    """
+    pool = bank.search_topic(topic)
+    key = topic_pool_key(topic, pool)
+    game = game_slot.get("game")
+    if game is None or game_slot.get("key") != key or not game.advance_to(history):
+        # Primeiro turno, outro tópico, pool do tópico alterado ou histórico que não continua o anterior
+        game = InterviewGame(pool, history, persistent=True)
+        game_slot.update(game=game, key=key)
+    return game
+
+@traced()
+async def next_adversarial_move(topic: str, history: list, game_slot=None) -> dict: 
   
     if not history:
-        await fetch_new_questions(topic)
+        await fetch_new_questions_streaming(topic)
     
-    full_pool = st.session_state.POOL_ATUAL
-    topic_pool = [q for q in full_pool if topic.lower() in q['topic'].lower()]
- 
-    if not topic_pool:
-        topic_pool = [q for q in full_pool if 'python' in q['topic'].lower()]
+    bank = get_question_bank()
+    search_topic = interview_topic(bank, topic)
+    if search_topic != topic:
         log_to_terminal(f"Aviso: Não há perguntas de '{topic}'. Usando backup (Python).")
 
-    game = InterviewGame(topic_pool, history) 
-    best_q, stats = game.get_best_next_question()
+    def decide():
+        if game_slot is not None:
+            game = session_game(game_slot, bank, search_topic, history)
+        else:
+            game = InterviewGame.from_bank(bank, search_topic, history)
+        return game.get_best_next_question_timed(time_budget=ADVERSARIAL_TIME_BUDGET)
+
+    best_q, stats = decide()
+    if not best_q and await wait_for_stream(search_topic):
+        # Resposta rápida: o pool do tópico ainda estava a chegar em streaming; recalcula com o pool completo
+        best_q, stats = decide()
     
     if best_q: 
-        print(f"\n[METRICAS - ADVERSARIAL (MINIMAX)]")
-        print(f"   ├── Estratégia: Maximizar Dificuldade vs Performance")
-        print(f"   ├── Nós da Árvore Visitados: {stats['nodes_visited']}")
-        print(f"   ├── Decisão Ótima ID: {best_q['id']} (Nível: {best_q['level']})")
-        print(f"   └── Tempo de Decisão: {stats['time_seconds']:.6f} segundos")
-        print("-" * 50)
+        log_to_terminal(f"Minimax: pergunta {best_q['id']} (Nível: {best_q['level']}, Profundidade: {stats['depth']}, "
+                        f"Reaproveitados: {stats['nodes_reused']}).")
+        metrics_logger.log_adversarial_decision(stats['time_seconds'], stats['nodes_visited'])
         return {"success": True, "data": [best_q], "stats": stats, "type": "interview_step"}
     
     return {"success": False}
 
-async def agent_router(user_input):
+@traced()
+async def agent_router(user_input, on_tool_result=None, on_api_response=None, game_slot=None):
     log_to_terminal(f"Input: {user_input}")
-    
-    clean_input = user_input.lower().replace("?", "").replace("!", "").replace(".", "")
-    
-    stopwords = [
-        "quero", "um", "uma", "quiz", "sobre", "de", "do", "da", "em", "para", 
-        "plano", "entrevista", "teste", "gerar", "criar", "fazer", "agora", "rápido"
-    ]
-    words = clean_input.split()
-    potential_topics = [w for w in words if w not in stopwords]
-
-    if potential_topics:
-        topic = potential_topics[-1] 
-    else:
-        topic = "General Tech" #Se o user digitar só "Quero um quiz" e mais nada
 
-    if len(topic) > 3: 
-        topic = topic.capitalize()
+    route = route_input(user_input)
+    topic = route["topic"]
+    log_to_terminal(f"Router local: intenção '{route['intent']}' | tópico '{topic}' | "
+                    f"confiança {route['confidence']:.2f} ({route['seconds'] * 1e6:.0f}µs)")
+            
+    async def ask_router_llm():
+        start_time = time.time()
+        try:
+            result = await get_llm_manager().run_agent(task=user_input, name="WiseIn",
+                                                       system_message=LLM_ROUTE_INSTRUCTIONS, timeout=LLM_CALL_TIMEOUT)
+        except CircuitOpenError:
+            # Circuito aberto: Modo Offline de imediato, sem esperar pelo timeout
+            log_to_terminal("Router LLM em pausa (circuito aberto): Modo Offline.")
+            return None, None, None
+        except Exception as e:
+            metrics_logger.log_llm_call("WiseIn", time.time() - start_time, False)
+            log_to_terminal(f"Router LLM indisponível: {type(e).__name__}")
+            return None, None, None
+        metrics_logger.log_llm_call("WiseIn", time.time() - start_time, True)
+        api_response, intent, llm_topic = IntentRouter.parse_llm_route(result.messages[-1].content)
+        if on_api_response and api_response:
+            on_api_response(api_response)
+        return api_response, intent, llm_topic
+
+    async def run_local_tool(intent, topic):
+        if intent == QUIZ:
+            return await generate_quiz_plan(topic)
+        if intent == INTERVIEW:
+            return await next_adversarial_move(topic, [], game_slot)
+        return None
+
+    def finish(api_response, tool_result, failed_over, topic):
+        if on_tool_result and tool_result:
+            on_tool_result(tool_result, topic)
+        return api_response, tool_result, failed_over, topic
+
+    if not route["use_llm"]:
+        # Confiança alta: a chamada ao router LLM é dispensada
+        return finish(None, await run_local_tool(route["intent"], topic), False, topic)
+
+    # Confiança baixa: o LLM responde e classifica. Entretanto a ferramenta já corre com a decisão local
+    # (como antes, em paralelo com o LLM) e é mostrada assim que termina; só é refeita se o LLM discordar
+    async def run_speculative():
+        result = await run_local_tool(route["intent"], topic)
+        if on_tool_result and result:
+            on_tool_result(result, topic)
+        return result
+
+    speculative = asyncio.ensure_future(run_speculative()) if route["intent"] else None
+    api_response, intent, llm_topic = await ask_router_llm()
+    intent = intent or route["intent"]
+    llm_topic = llm_topic or topic
+    if fold(llm_topic) == fold(topic):
+        llm_topic = topic  # o LLM formata o nome ('Python'); fica a grafia do banco
+    log_to_terminal(f"Router LLM: intenção '{intent}' | tópico '{llm_topic}'")
+
+    if speculative and (intent, llm_topic) == (route["intent"], topic):
+        # Já mostrado por run_speculative
+        return api_response, await speculative, api_response is None, llm_topic
+
+    shown = None
+    if speculative:
+        if speculative.done() and not speculative.cancelled() and speculative.exception() is None:
+            shown = speculative.result()
+        else:
+            speculative.cancel()
+            await asyncio.gather(speculative, return_exceptions=True)
+    tool_result = await run_local_tool(intent, llm_topic)
+    if shown and shown['success'] and not (tool_result and tool_result['success']):
+        # O LLM discordou mas a alternativa não dá sessão: fica a que já está no ecrã
+        return api_response, shown, api_response is None, topic
+    return finish(api_response, tool_result, api_response is None, llm_topic)
+
+
+@st.cache_resource
+def get_prefetch_executor():
+    # Partilhado por todas as sessões; cada tarefa é uma decisão do Minimax com orçamento fixo
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="InterviewPrefetch")
+
+
+def schedule_prefetch(topic, history):
+    """Calcula em fundo a próxima jogada para o histórico que existirá depois da resposta atual."""
+    if len(history) >= INTERVIEW_TURNS:
+        return
+    history = list(history)
+    previous = st.session_state.get("prefetch")
+    if previous and not previous["future"].cancel():
+        # Sessão substituída (o LLM discordou): o jogo da sessão não pode ser usado por dois threads
+        concurrent.futures.wait([previous["future"]])
+    game_slot = st.session_state.interview_game
+    # Chave lida antes de a tarefa começar: nunca descreve um pool mais novo do que o que ela viu
+    key = prefetch_key(topic, history)
+    future = get_prefetch_executor().submit(lambda: asyncio.run(next_adversarial_move(topic, history, game_slot)))
+    st.session_state.prefetch = {"key": key, "future": future}
+
+
+def prefetch_key(topic, history):
+    # Inclui o pool do tópico: com streaming, a 1ª jogada antecipada pode ter visto só a 1ª pergunta
+    bank = get_question_bank()
+    search_topic = interview_topic(bank, topic)
+    return (topic, tuple(history), topic_pool_key(search_topic, bank.search_topic(search_topic)))
+
+
+def take_prefetched_move(topic, history):
+    """Usa a jogada antecipada se o histórico e o pool do tópico baterem certo; senão (ou em erro/sem jogada) recalcula."""
+    prefetch = st.session_state.get("prefetch")
+    st.session_state.prefetch = None
+
+    res = None
+    if prefetch and prefetch["key"] == prefetch_key(topic, history):
+        try:
+            res = prefetch["future"].result()
+        except Exception as e:
+            log_to_terminal(f"Prefetch falhou: {e}")
+        if res is not None and not res["success"]:
+            res = None
+    elif prefetch and not prefetch["future"].cancel():
+        # Ainda a correr: espera (orçamento fixo) para não usar o jogo da sessão em dois threads
+        concurrent.futures.wait([prefetch["future"]])
+
+    metrics_logger.log_cache_access("interview_prefetch", res is not None)
+    if res is None:
+        res = asyncio.run(next_adversarial_move(topic, history, st.session_state.interview_game))
+    return res
+
+
+def start_session(res, topic_detected, slot=None):
+    """Mostra a 1ª pergunta (em `slot`, se dado) e devolve a mensagem acrescentada ao histórico."""
+    if not (res and res['success']):
+        return None
+
+    st.session_state.q_queue = res['data']
+    st.session_state.active_session = True
+    st.session_state.current_topic = topic_detected
+    st.session_state.q_index = 0
+    st.session_state.history_ids = []
+
+    st.session_state.active_mode = 'quiz' if res['type'] == 'quiz_plan' else 'interview'
+
+    first = res['data'][0]
+    first_txt = get_question_bank().get_knowledge(first['id'])['q']
+    stats = res['stats']
+
+    # Intro
+    intro_html = ""
+    if st.session_state.active_mode == 'quiz':
+        intro_html = f"<b>Plano Gerado</b> <span class='algo-tag'>{stats.get('steps_explored',0)} passos</span><br><br>"
     else:
-        topic = topic.upper()
+        intro_html = f"<b>Entrevista Iniciada</b> <span class='algo-tag'>{stats.get('nodes_visited',0)} nós</span><br><br>"
 
-    log_to_terminal(f"Tópico detetado: '{topic}'")
-            
-    client = OpenAIChatCompletionClient(**CLIENT_CONFIG)
-    router_agent = AssistantAgent(name="WiseIn", model_client=client, system_message="Seja breve.")
-    
-    api_response = None
-    try:
-        result = await router_agent.run(task=user_input)
-        api_response = result.messages[-1].content
-    except:
-        pass 
-    
-    tool_result = None
-    if "quiz" in user_input.lower() or "plano" in user_input.lower():
-        tool_result = await generate_quiz_plan(topic)
-    elif "entrevista" in user_input.lower():
-        tool_result = await next_adversarial_move(topic, [])
-    
-    return api_response, tool_result, False, topic
+    q_display = f"""{intro_html}<div class="question-box">Pergunta 1: {first_txt}</div>"""
+    (slot or st).markdown(q_display, unsafe_allow_html=True)
+    message = {"role": "assistant", "content": q_display}
+    st.session_state.messages.append(message)
+
+    if st.session_state.active_mode == 'interview':
+        schedule_prefetch(topic_detected, [first['id']])
+    return message
+
+
+@st.cache_resource
+def get_run_counter():
+    return {"runs": 0}
+
+
+def record_first_paint():
+    """Tempo desde o início do rerun até o histórico estar desenhado; o 1º run do processo é o 'cold'."""
+    counter = get_run_counter()
+    run_kind = "cold" if counter["runs"] == 0 else "warm"
+    counter["runs"] += 1
+    metrics_logger.log_app_render(run_kind, _IMPORTS_DONE - _RUN_START, time.perf_counter() - _RUN_START)
+    if run_kind == "cold":
+        # O stack do LLM carrega em fundo enquanto o utilizador escreve
+        get_llm_manager().warm_up()
 
 
 def main():
@@ -284,13 +623,18 @@ def main():
 
     with st.sidebar:
         st.caption("Painel de Controle")
-        st.success("Sistema Online")
+        if get_llm_manager().breaker.state == CLOSED:
+            st.success("Sistema Online")
+        else:
+            st.warning("Modo Offline (LLM indisponível)")
         if st.button("Reiniciar", type="primary", use_container_width=True):
             st.session_state.messages = []
             st.session_state.active_session = None
             st.session_state.active_mode = None 
             st.session_state.history_ids = []  
             st.session_state.current_topic = None
+            st.session_state.prefetch = None
+            st.session_state.interview_game = {}
             st.rerun()
         st.caption("WiseIn Tech Tutor")
 
@@ -303,6 +647,7 @@ def main():
         st.session_state.current_topic = "python"
         st.session_state.q_queue = []
         st.session_state.q_index = 0
+        st.session_state.interview_game = {}
 
     for msg in st.session_state.messages:
         with st.chat_message(msg["role"]): 
@@ -311,92 +656,99 @@ def main():
             else:
                 st.markdown(msg["content"])
 
+    record_first_paint()
+
     if prompt := st.chat_input("Ex: Quero uma entrevista de Java..."):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"): st.markdown(prompt)
+        handle_prompt(prompt)
 
-        with st.chat_message("assistant"):
-            placeholder = st.empty()
-            
 
-            if st.session_state.active_session:
-                current_q = st.session_state.q_queue[st.session_state.q_index]
-                db_data = st.session_state.DB_PERGUNTAS.get(current_q['id'])
-                
-                if db_data:
-                    correct = prompt.lower() in db_data['a'].lower()
-                    feedback = db_data['ok'] if correct else f"{db_data['nok']} (Resp: **{db_data['a']}**)"
-                    st.markdown(feedback)
-                    st.session_state.messages.append({"role": "assistant", "content": feedback})
-                    st.session_state.history_ids.append(current_q['id'])
-                    
-                    should_continue = False
-                    next_q_data = None
-                    
-                    if st.session_state.active_mode == 'quiz':
-                        st.session_state.q_index += 1
-                        if st.session_state.q_index < len(st.session_state.q_queue):
-                            next_q_data = st.session_state.q_queue[st.session_state.q_index]
-                            should_continue = True
-                            
-                    elif st.session_state.active_mode == 'interview':
-                        if len(st.session_state.history_ids) < 5: 
-                            with st.spinner("Calculando melhor jogada..."):
-                                res = asyncio.run(next_adversarial_move(st.session_state.current_topic, st.session_state.history_ids))
-                                if res['success']:
-                                    next_q_data = res['data'][0] 
-                                    st.session_state.q_queue = [next_q_data]
-                                    st.session_state.q_index = 0
-                                    should_continue = True
-                    
-                    if should_continue and next_q_data:
-                        next_db = st.session_state.DB_PERGUNTAS.get(next_q_data['id'])
-                        if next_db:
-                            time.sleep(0.5)
-                            prefixo = f"Pergunta {len(st.session_state.history_ids) + 1}"
-                            q_display = f"""<div class="question-box">{prefixo}: {next_db['q']}</div>"""
-                            st.markdown(q_display, unsafe_allow_html=True)
-                            st.session_state.messages.append({"role": "assistant", "content": q_display})
-                        else:
-                            st.error("Erro dados.")
-                    else:
-                        end_msg = "**Sessão Terminada!**"
-                        st.markdown(end_msg)
-                        st.session_state.messages.append({"role": "assistant", "content": end_msg})
-                        st.session_state.active_session = None
-            
-            else:
-                with st.spinner("A iniciar agentes..."):
-                    api_txt, res, fail, topic_detected = asyncio.run(agent_router(prompt))
-                
-                if res and res['success']:
-                    st.session_state.q_queue = res['data']
-                    st.session_state.active_session = True
-                    st.session_state.current_topic = topic_detected
-                    st.session_state.q_index = 0
-                    st.session_state.history_ids = []
-                    
-                    st.session_state.active_mode = 'quiz' if res['type'] == 'quiz_plan' else 'interview'
-                    
-                    first = res['data'][0]
-                    first_txt = st.session_state.DB_PERGUNTAS[first['id']]['q']
-                    stats = res['stats']
-                    
-                    # Intro
-                    intro_html = ""
-                    if st.session_state.active_mode == 'quiz':
-                        intro_html = f"<b>Plano Gerado</b> <span class='algo-tag'>{stats.get('steps_explored',0)} passos</span><br><br>"
+@traced("user_turn", root=True)
+def handle_prompt(prompt):
+    st.session_state.messages.append({"role": "user", "content": prompt})
+    with st.chat_message("user"): st.markdown(prompt)
+
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+
+
+        if st.session_state.active_session:
+            current_q = st.session_state.q_queue[st.session_state.q_index]
+            db_data = get_question_bank().get_knowledge(current_q['id'])
+
+            if db_data:
+                correct = prompt.lower() in db_data['a'].lower()
+                feedback = db_data['ok'] if correct else f"{db_data['nok']} (Resp: **{db_data['a']}**)"
+                st.markdown(feedback)
+                st.session_state.messages.append({"role": "assistant", "content": feedback})
+                st.session_state.history_ids.append(current_q['id'])
+
+                should_continue = False
+                next_q_data = None
+
+                if st.session_state.active_mode == 'quiz':
+                    st.session_state.q_index += 1
+                    if st.session_state.q_index < len(st.session_state.q_queue):
+                        next_q_data = st.session_state.q_queue[st.session_state.q_index]
+                        should_continue = True
+
+                elif st.session_state.active_mode == 'interview':
+                    if len(st.session_state.history_ids) < INTERVIEW_TURNS:
+                        with st.spinner("Calculando melhor jogada..."):
+                            res = take_prefetched_move(st.session_state.current_topic, st.session_state.history_ids)
+                            if res['success']:
+                                next_q_data = res['data'][0] 
+                                st.session_state.q_queue = [next_q_data]
+                                st.session_state.q_index = 0
+                                should_continue = True
+
+                if should_continue and next_q_data:
+                    next_db = get_question_bank().get_knowledge(next_q_data['id'])
+                    if next_db:
+                        prefixo = f"Pergunta {len(st.session_state.history_ids) + 1}"
+                        q_display = f"""<div class="question-box">{prefixo}: {next_db['q']}</div>"""
+                        st.markdown(q_display, unsafe_allow_html=True)
+                        st.session_state.messages.append({"role": "assistant", "content": q_display})
+                        if st.session_state.active_mode == 'interview':
+                            schedule_prefetch(st.session_state.current_topic,
+                                              st.session_state.history_ids + [next_q_data['id']])
                     else:
-                        intro_html = f"<b>Entrevista Iniciada</b> <span class='algo-tag'>{stats.get('nodes_visited',0)} nós</span><br><br>"
-                    
-                    q_display = f"""{intro_html}<div class="question-box">Pergunta 1: {first_txt}</div>"""
-                    st.markdown(q_display, unsafe_allow_html=True)
-                    st.session_state.messages.append({"role": "assistant", "content": q_display})
-                    
+                        st.error("Erro dados.")
                 else:
-                    err_msg = "Não consegui iniciar. Tente 'Quiz de Python' ou 'Entrevista AWS'."
-                    st.markdown(err_msg)
-                    st.session_state.messages.append({"role": "assistant", "content": err_msg})
+                    end_msg = "**Sessão Terminada!**"
+                    st.markdown(end_msg)
+                    st.session_state.messages.append({"role": "assistant", "content": end_msg})
+                    st.session_state.active_session = None
+
+        else:
+            # O quiz aparece assim que o algoritmo local termina; o texto do LLM entra acima quando chegar
+            llm_index = len(st.session_state.messages)
+
+            def show_api_text(text):
+                placeholder.markdown(text)
+                st.session_state.messages.insert(llm_index, {"role": "assistant", "content": text})
+
+            session_slot = st.empty()
+            shown_session = {}
+
+            def show_session(res, topic):
+                # Uma 2ª chamada é o LLM a discordar da decisão local já mostrada: substitui-a
+                previous = shown_session.get("message")
+                if previous is not None:
+                    st.session_state.messages = [m for m in st.session_state.messages if m is not previous]
+                shown_session["message"] = start_session(res, topic, session_slot)
+
+            # Jogo do Minimax desta sessão de entrevista (reaproveitado entre turnos)
+            st.session_state.interview_game = {}
+            with st.spinner("A iniciar agentes..."):
+                api_txt, res, fail, topic_detected = asyncio.run(
+                    agent_router(prompt, on_tool_result=show_session, on_api_response=show_api_text,
+                                 game_slot=st.session_state.interview_game)
+                )
+
+            if not (res and res['success']):
+                err_msg = "Não consegui iniciar. Tente 'Quiz de Python' ou 'Entrevista AWS'."
+                st.markdown(err_msg)
+                st.session_state.messages.append({"role": "assistant", "content": err_msg})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Dict, Optional, Any
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from logic.fake_llm_server import FakeLLMServer
+
+TOPICS = ["Python", "AWS", "Java", "Docker", "SQL", "Kubernetes", "React", "Linux"]
+
+# Pedidos ambíguos (sem intenção clara ou com duas): o router local não decide e chama o router LLM
+VAGUE_QUIZ_PROMPTS = ["Ajuda-me a estudar {topic}", "Tenho de rever {topic}, o que me aconselhas?"]
+VAGUE_INTERVIEW_PROMPTS = ["Quero treinar para a entrevista, talvez com um quiz de {topic}",
+                           "Entrevista ou quiz? Prefiro a entrevista de {topic}"]
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.failures: Dict[str, int] = {}
+        self.router_calls = 0
+        self.llm_routes = 0
+        self.failovers = 0
+
+    def record(self, operation: str, seconds: float, success: bool):
+        self.latencies.setdefault(operation, []).append(seconds)
+        if not success:
+            self.failures[operation] = self.failures.get(operation, 0) + 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        operations = {}
+        total = 0
+        for operation, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            total += len(values)
+            operations[operation] = {
+                "count": len(values),
+                "failures": self.failures.get(operation, 0),
+                "throughput_per_s": len(values) / wall_seconds if wall_seconds else 0.0,
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p90_ms": percentile(values, 0.90) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return {
+            "wall_seconds": wall_seconds,
+            "operations_total": total,
+            "throughput_per_s": total / wall_seconds if wall_seconds else 0.0,
+            "router_calls": self.router_calls,
+            "router_llm_calls": self.llm_routes,
+            "failover_rate": self.failovers / self.llm_routes if self.llm_routes else 0.0,
+            "operations": operations,
+        }
+
+
+async def timed(stats: LoadStats, operation: str, coro):
+    start = time.perf_counter()
+    try:
+        result = await coro
+    except Exception:
+        stats.record(operation, time.perf_counter() - start, False)
+        return None
+    return result, start
+
+async def route(app, stats: LoadStats, prompt: str, operation: str):
+    outcome = await timed(stats, operation, app.agent_router(prompt))
+    if outcome is None:
+        return None
+    (api_response, tool_result, failed_over, topic), start = outcome
+    stats.record(operation, time.perf_counter() - start, bool(tool_result and tool_result['success']))
+    stats.router_calls += 1
+    if api_response is not None or failed_over:
+        stats.llm_routes += 1
+    if failed_over:
+        # O LLM era preciso mas falhou/expirou e a resposta veio só do algoritmo local (Modo Offline)
+        stats.failovers += 1
+    return tool_result, topic
+
+async def simulated_user(app, stats: LoadStats, user_id: int, iterations: int, quiz_ratio: float,
+                         interview_turns: int, think_time: float, vague_ratio: float = 0.0):
+    rng = random.Random(user_id)
+    for _ in range(iterations):
+        topic = rng.choice(TOPICS)
+        vague = rng.random() < vague_ratio
+        suffix = "_vague" if vague else ""
+        if rng.random() < quiz_ratio:
+            prompt = rng.choice(VAGUE_QUIZ_PROMPTS) if vague else "Quero um quiz de {topic}"
+            await route(app, stats, prompt.format(topic=topic), "router_quiz" + suffix)
+        else:
+            prompt = rng.choice(VAGUE_INTERVIEW_PROMPTS) if vague else "Quero uma entrevista de {topic}"
+            routed = await route(app, stats, prompt.format(topic=topic), "router_interview" + suffix)
+            if routed and routed[0] and routed[0]['success']:
+                tool_result, detected = routed
+                history = [tool_result['data'][0]['id']]
+                for _ in range(interview_turns - 1):
+                    outcome = await timed(stats, "interview_turn", app.next_adversarial_move(detected, history))
+                    if outcome is None:
+                        break
+                    res, start = outcome
+                    # success=False aqui só quer dizer que o banco ficou sem perguntas: a entrevista acaba
+                    stats.record("interview_turn", time.perf_counter() - start, True)
+                    if not res['success']:
+                        break
+                    history.append(res['data'][0]['id'])
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, think_time))
+
+async def run_users(app, args: argparse.Namespace) -> LoadStats:
+    stats = LoadStats()
+    await asyncio.gather(*(
+        simulated_user(app, stats, user_id, args.iterations, args.quiz_ratio, args.interview_turns, args.think_time,
+                       args.vague_ratio)
+        for user_id in range(args.users)
+    ))
+    return stats
+
+def print_report(report: Dict[str, Any]):
+    summary = report["summary"]
+    print(f"\n{'='*78}")
+    print(f" LOAD TEST | {report['config']['users']} utilizadores | {summary['wall_seconds']:.1f}s")
+    print(f"{'='*78}")
+    print(f"{'operação':<18}{'n':>6}{'falhas':>8}{'ops/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, row in summary["operations"].items():
+        print(f"{operation:<18}{row['count']:>6}{row['failures']:>8}{row['throughput_per_s']:>9.2f}"
+              f"{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    print(f"\nThroughput total: {summary['throughput_per_s']:.2f} ops/s")
+    print(f"Router LLM: {summary['router_llm_calls']} de {summary['router_calls']} chamadas (as restantes decididas localmente)")
+    print(f"Failover (router LLM sem resposta): {summary['failover_rate']:.1%} de {summary['router_llm_calls']} chamadas")
+    print(f"Servidor falso: {report['server']}")
+    print(f"Circuit breaker: {report['circuit']['state']} | chamadas recusadas: {report['circuit']['rejected']}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Teste de carga do WiseIn contra um servidor OpenAI-compatível local.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=3, help="Sessões (quiz ou entrevista) por utilizador.")
+    parser.add_argument("--quiz-ratio", type=float, default=0.5)
+    parser.add_argument("--vague-ratio", type=float, default=0.3,
+                        help="Fração de pedidos ambíguos, que o router local passa ao router LLM.")
+    parser.add_argument("--interview-turns", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.5, help="Pausa máxima (s) entre sessões.")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--burst-every", type=float, default=10.0, help="Período (s) das rajadas de 429 (0 desliga).")
+    parser.add_argument("--burst-length", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Grava o relatório em JSON neste caminho.")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs por pedido (HTTP, LLM, métricas).")
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer(port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           burst_every=args.burst_every, burst_length=args.burst_length, seed=0).start()
+
+    # A app lê o endpoint ao importar; caches e banco vão para uma pasta temporária
+    os.environ["WISEIN_LLM_BASE_URL"] = server.base_url
+    os.environ["OPENROUTER_API_KEY"] = "fake-key"
+    os.environ.setdefault("WISEIN_TRACE_SAMPLE_RATE", "0")
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    os.chdir(tempfile.mkdtemp(prefix="wisein_load_"))
+
+    import app_ui
+    from logic.llm_client import shutdown_client_managers
+
+    if not args.verbose:
+        for name in ("httpx", "openai", "autogen_core", "autogen_core.events", "autogen_agentchat", "TechLinguaMetrics"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        app_ui.log_to_terminal = lambda message: None
+
+    breaker = app_ui.get_llm_manager().breaker
+    try:
+        start = time.perf_counter()
+        stats = asyncio.run(run_users(app_ui, args))
+        wall = time.perf_counter() - start
+        # Estado do circuito no fim da carga, antes de o encerramento cancelar o que ainda corre
+        circuit = {"state": breaker.state, "rejected": breaker.rejected}
+    finally:
+        shutdown_client_managers()
+        server.stop()
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "json_path"},
+        "summary": stats.summary(wall),
+        "server": dict(server.stats),
+        "circuit": circuit,
+    }
+    print_report(report)
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRelatório gravado em {json_path}")
+
+if __name__ == "__main__":
+    main()
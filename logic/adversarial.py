@@ -2,69 +2,219 @@ import math
 import time
 from typing import List, Dict, Optional, Any, Tuple
 
+import numpy as np
+
+try:
+    from logic.question import Question, EASY, MEDIUM, HARD
+    from logic.tracing import traced
+except ImportError:
+    from question import Question, EASY, MEDIUM, HARD
+    from tracing import traced
+
+# Desempenho do aluno por nível: o primeiro valor é o melhor que ele consegue (resposta do Min)
+PERFORMANCE_OUTCOMES = {
+    'easy': (0.9, 0.6),
+    'medium': (0.5, 0.2),
+    'hard': (0.3, 0.0),
+}
+
+# Representação compacta: nível -> código inteiro (níveis desconhecidos contam como 'medium')
+LEVEL_CODES = {'easy': EASY, 'medium': MEDIUM, 'hard': HARD}
+LEVEL_WEIGHTS = (1, 5, 10)
+OUTCOMES_BY_CODE = (PERFORMANCE_OUTCOMES['easy'], PERFORMANCE_OUTCOMES['medium'], PERFORMANCE_OUTCOMES['hard'])
+LEVEL_VALUES = np.array(LEVEL_WEIGHTS, dtype=float)
+EXPECTED_PERFORMANCE = np.array([outcomes[0] for outcomes in OUTCOMES_BY_CODE])
+
+def level_code(question) -> int:
+    if type(question) is Question:
+        code = question.level_code
+        return code if code <= HARD else MEDIUM
+    return LEVEL_CODES.get(question.get('level', 'medium'), MEDIUM)
+
+# Até esta profundidade a árvore é só "pergunta + resposta esperada" e resolve-se em forma fechada
+CLOSED_FORM_MAX_DEPTH = 2
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class SearchTimeout(Exception):
+    pass
+
 class InterviewGame:
-    def __init__(self, available_questions: List[Dict[str, Any]], history: List[int]):
+    def __init__(self, available_questions: List[Dict[str, Any]], history: List[int], persistent: bool = False):
         self.questions = available_questions
-        self.history = history
-        self.nodes_visited = 0  
+        self.history = list(history)
+        self.history_set = set(history)
+        # persistent=True: a tabela de transposição sobrevive entre turnos (ver advance)
+        self.persistent = persistent
+        self.turn = 0
+        self.nodes_visited = 0
+        self.nodes_pruned = 0
+        self.tt_hits = 0
+        self.tt_reused_hits = 0
+        self.tt_reused_entries = 0
+        self.transposition_table = {}
+        self.deadline = None
+        self.build_arrays()
+        self._moves = self._ordered_moves()
+
+    @classmethod
+    def from_bank(cls, bank, topic: str, history: List[int], persistent: bool = False) -> "InterviewGame":
+        """Candidatos = perguntas do QuestionBank cujo tópico contém `topic`."""
+        return cls(bank.search_topic(topic), history, persistent)
+
+    def advance(self, question_id: int):
+        """Passa ao turno seguinte depois de `question_id` ter sido feita.
+
+        Uma entrada da tabela cujo ramo já fez `question_id` descreve a mesma subárvore no jogo novo
+        (o id passa de `asked` para o histórico), por isso é mantida; as restantes assumiam o id disponível.
+        """
+        if question_id in self.history_set:
+            return
+        self.history.append(question_id)
+        self.history_set.add(question_id)
+        self.turn += 1
+
+        table = {}
+        for (asked, current_id, depth, is_max), entry in self.transposition_table.items():
+            if question_id in asked and current_id != question_id:
+                table[(asked - {question_id}, current_id, depth, is_max)] = entry
+        self.transposition_table = table
+
+    def advance_to(self, history: List[int]) -> bool:
+        """Avança até `history`; False se não for uma continuação do histórico atual (é preciso um jogo novo)."""
+        if list(history[:len(self.history)]) != self.history:
+            return False
+        for question_id in history[len(self.history):]:
+            self.advance(question_id)
+        return True
+
+    def build_arrays(self):
+        """Pool em arrays NumPy: códigos de nível, desempenho esperado e pontuação de folha."""
+        self.ids = np.array([q['id'] for q in self.questions])
+        self.level_codes = np.array([level_code(q) for q in self.questions], dtype=np.int8)
+        self.expected_performance = EXPECTED_PERFORMANCE[self.level_codes]
+        self.leaf_scores = LEVEL_VALUES[self.level_codes] * (1.0 - self.expected_performance)
+        self._leaf_score_by_id = dict(zip(self.ids.tolist(), self.leaf_scores.tolist()))
+
+    def _available_mask(self) -> np.ndarray:
+        if not self.history_set or len(self.ids) == 0:
+            return np.ones(len(self.questions), dtype=bool)
+        return ~np.isin(self.ids, np.fromiter(self.history_set, dtype=self.ids.dtype, count=len(self.history_set)))
 
     def utility_function(self, question: Dict, simulated_student_performance: float) -> float:
-        level = question.get('level', 'medium')
-        
-        level_value = 5
-        if level == 'hard':
-            level_value = 10
-        elif level == 'easy':
-            level_value = 1
-            
+        level_value = LEVEL_WEIGHTS[level_code(question)]
         return level_value - (level_value * simulated_student_performance)
 
+    def performance_outcomes(self, question: Dict) -> Tuple[float, ...]:
+        return OUTCOMES_BY_CODE[level_code(question)]
+
     def get_possible_moves(self) -> List[Dict]:
-        return [q for q in self.questions if q['id'] not in self.history]
+        return [q for q in self.questions if q['id'] not in self.history_set]
 
-    def minimax(self, depth: int, is_maximizing_player: bool, current_question: Optional[Dict] = None) -> Any:
-        self.nodes_visited += 1  
-        
-        possible_moves = self.get_possible_moves()
-        if depth == 0 or not possible_moves:
+    def _ordered_moves(self) -> List[Dict]:
+        # Ordenação estável: perguntas mais valiosas primeiro melhora os cortes alfa-beta
+        positions = np.flatnonzero(self._available_mask())
+        order = positions[np.argsort(-self.leaf_scores[positions], kind='stable')]
+        return [self.questions[i] for i in order]
+
+    def minimax(self, depth: int, is_maximizing_player: bool, current_question: Optional[Dict] = None,
+                alpha: float = -math.inf, beta: float = math.inf, asked: frozenset = frozenset()) -> float:
+        """Valor da subárvore (utilidade acumulada a partir deste nó) com cortes alfa-beta."""
+        self.nodes_visited += 1
+        if self.deadline is not None and self.nodes_visited % 256 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if depth == 0:
             if current_question:
-                base_performance = 0.5
-                lvl = current_question.get('level', 'medium')
-                
-                if lvl == 'hard':
-                    base_performance = 0.3
-                elif lvl == 'easy':
-                    base_performance = 0.9
-                
-                return self.utility_function(current_question, base_performance)
+                return self._leaf_score_by_id[current_question['id']]
             return 0
 
+        # O valor só depende das perguntas restantes (histórico fixo + perguntas já feitas neste ramo)
+        current_id = current_question['id'] if current_question else None
+        key = (asked, current_id, depth, is_maximizing_player)
+        entry = self.transposition_table.get(key)
+        if entry is not None:
+            flag, value, turn = entry
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                self.tt_hits += 1
+                if turn < self.turn:
+                    self.tt_reused_hits += 1
+                return value
+
+        alpha_orig, beta_orig = alpha, beta
+
         if is_maximizing_player:
-            max_eval = -math.inf
-            best_move = None
-
-            for question in possible_moves:
-                eval_score = self.minimax(depth - 1, False, question)
-                
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                    best_move = question
-            
-            if depth == 2: 
-                return best_move
-            return max_eval
+            moves = [q for q in self._moves if q['id'] not in asked]
+            if not moves:
+                return 0
 
+            value = -math.inf
+            for i, question in enumerate(moves):
+                value = max(value, self.minimax(depth - 1, False, question, alpha, beta, asked | {question['id']}))
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    self.nodes_pruned += len(moves) - i - 1
+                    break
         else:
-            return self.minimax(depth - 1, True, current_question)
+            outcomes = self.performance_outcomes(current_question)
+            value = math.inf
+            for i, performance in enumerate(outcomes):
+                gained = self.utility_function(current_question, performance)
+                value = min(value, gained + self.minimax(depth - 1, True, None, alpha - gained, beta - gained, asked))
+                beta = min(beta, value)
+                if alpha >= beta:
+                    self.nodes_pruned += len(outcomes) - i - 1
+                    break
 
-    def get_best_next_question(self) -> Tuple[Optional[Dict], Dict[str, Any]]:
-        start_time = time.time()
+        if value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transposition_table[key] = (flag, value, self.turn)
+        return value
+
+    def _search_root(self, depth: int) -> Tuple[Optional[Dict], float]:
+        best_question = None
+        best_value = -math.inf
+        self.nodes_visited += 1
+        for question in self._moves:
+            try:
+                value = self.minimax(depth - 1, False, question, best_value, math.inf, frozenset([question['id']]))
+            except SearchTimeout:
+                # Guarda o melhor lance já avaliado por completo nesta iteração
+                self._partial_best = best_question
+                raise
+            if value > best_value:
+                best_value = value
+                best_question = question
+        return best_question, best_value
+
+    def _reset_search(self):
         self.nodes_visited = 0
+        self.nodes_pruned = 0
+        self.tt_hits = 0
+        self.tt_reused_hits = 0
+        if not self.persistent:
+            self.transposition_table = {}
+        self.tt_reused_entries = sum(1 for entry in self.transposition_table.values() if entry[2] < self.turn)
+        self._moves = self._ordered_moves()
+
+    @traced()
+    def get_best_next_question(self, depth: int = 2) -> Tuple[Optional[Dict], Dict[str, Any]]:
+        start_time = time.time()
+        self._reset_search()
+        self.deadline = None
         
-        if not self.get_possible_moves():
+        if not self._moves:
             return None, {"success": False, "reason": "No questions available"}
-            
-        best_question = self.minimax(depth=2, is_maximizing_player=True)
+
+        depth = max(depth, 1)
+        if depth <= CLOSED_FORM_MAX_DEPTH:
+            return self._best_closed_form(depth, start_time)
+
+        best_question, _ = self._search_root(depth)
         
         end_time = time.time()
          
@@ -72,7 +222,90 @@ class InterviewGame:
             "success": True,
             "time_seconds": end_time - start_time,
             "nodes_visited": self.nodes_visited,
-            "algorithm": "Minimax (Depth 2)"
+            "nodes_pruned": self.nodes_pruned,
+            "tt_hits": self.tt_hits,
+            "nodes_reused": self.tt_reused_hits,
+            "tt_reused_entries": self.tt_reused_entries,
+            "depth": depth,
+            "algorithm": f"Minimax Alpha-Beta (Depth {depth})"
         }
         
-        return best_question, stats
\ No newline at end of file
+        return best_question, stats
+
+    def _best_closed_form(self, depth: int, start_time: float) -> Tuple[Optional[Dict], Dict[str, Any]]:
+        # Uma ronda: o valor de cada lance é a sua pontuação de folha, calculada de uma só vez
+        positions = np.flatnonzero(self._available_mask())
+        best_pos = positions[np.argmax(self.leaf_scores[positions])]
+        self.nodes_visited = len(positions) + 1
+
+        end_time = time.time()
+
+        stats = {
+            "success": True,
+            "time_seconds": end_time - start_time,
+            "nodes_visited": self.nodes_visited,
+            "nodes_pruned": 0,
+            "tt_hits": 0,
+            "nodes_reused": 0,
+            "tt_reused_entries": 0,
+            "depth": depth,
+            "algorithm": f"Minimax Vetorizado (Depth {depth})"
+        }
+
+        return self.questions[best_pos], stats
+
+    @traced()
+    def get_best_next_question_timed(self, time_budget: float = 0.05, max_depth: Optional[int] = None) -> Tuple[Optional[Dict], Dict[str, Any]]:
+        """Aprofundamento iterativo (anytime): devolve sempre o melhor lance encontrado dentro do orçamento."""
+        start_time = time.time()
+        self._reset_search()
+        self.deadline = time.perf_counter() + time_budget
+
+        if not self._moves:
+            self.deadline = None
+            return None, {"success": False, "reason": "No questions available"}
+
+        # Cada ronda = pergunta do entrevistador + resposta do aluno
+        limit = 2 * len(self._moves)
+        if max_depth is not None:
+            limit = min(limit, max(max_depth, 1))
+
+        best_question = self._moves[0]
+        reached_depth = 0
+        timed_out = False
+        depth = min(2, limit)
+        while depth <= limit:
+            self._partial_best = None
+            try:
+                best_question, _ = self._search_root(depth)
+            except SearchTimeout:
+                # O lance da iteração anterior é avaliado primeiro, logo um parcial só pode ser melhor
+                if self._partial_best is not None:
+                    best_question = self._partial_best
+                timed_out = True
+                break
+            reached_depth = depth
+
+            # Move ordering: o melhor lance da iteração anterior vai à frente
+            self._moves.remove(best_question)
+            self._moves.insert(0, best_question)
+            depth += 2
+        self.deadline = None
+
+        end_time = time.time()
+
+        stats = {
+            "success": True,
+            "time_seconds": end_time - start_time,
+            "nodes_visited": self.nodes_visited,
+            "nodes_pruned": self.nodes_pruned,
+            "tt_hits": self.tt_hits,
+            "nodes_reused": self.tt_reused_hits,
+            "tt_reused_entries": self.tt_reused_entries,
+            "depth": reached_depth,
+            "timed_out": timed_out,
+            "time_budget": time_budget,
+            "algorithm": f"Minimax Alpha-Beta (Iterative Deepening, Depth {reached_depth})"
+        }
+
+        return best_question, stats
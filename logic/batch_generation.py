@@ -0,0 +1,138 @@
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+try:
+    from logic.llm_client import is_rate_limit_error
+except ImportError:
+    from llm_client import is_rate_limit_error
+
+class SingleFlight:
+    """Pedidos iguais em curso partilham a mesma execução (e o mesmo resultado).
+
+    Seguro entre threads e event loops (cada asyncio.run da UI tem o seu): quem chega primeiro corre fn(),
+    os restantes esperam um concurrent.futures.Future. Uma chamada aninhada com a mesma chave, feita
+    pelo próprio líder, corre fn() diretamente em vez de esperar por si mesma. Se o líder for cancelado,
+    quem esperava não herda o cancelamento: volta a tentar (e um deles passa a líder).
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (id(self), key)
+        leading = _leading.get()
+        if flight_key in leading:
+            return await fn()
+
+        while True:
+            with self._lock:
+                shared = self._in_flight.get(key)
+                is_leader = shared is None
+                if is_leader:
+                    shared = self._in_flight[key] = concurrent.futures.Future()
+            if is_leader:
+                break
+            await await_shared(shared)
+            if not shared.cancelled():
+                return shared.result()
+
+        token = _leading.set(leading | {flight_key})
+        try:
+            result = await fn()
+        except BaseException as e:
+            # Sai do mapa antes de acordar quem espera, para que uma nova tentativa não encontre este futuro
+            self._forget(key)
+            if isinstance(e, asyncio.CancelledError):
+                shared.cancel()
+            else:
+                shared.set_exception(e)
+            raise
+        finally:
+            _leading.reset(token)
+        self._forget(key)
+        shared.set_result(result)
+        return result
+
+    def _forget(self, key: Hashable):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+
+async def await_shared(future: concurrent.futures.Future):
+    """Espera (noutro loop) que o future termine, sem nunca o cancelar; o resultado fica no próprio future."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def resolve():
+        if not done.done():
+            done.set_result(None)
+
+    def wake(_):
+        try:
+            loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            pass  # o loop de quem esperava já fechou
+
+    future.add_done_callback(wake)
+    await done
+
+
+# Chaves que a tarefa atual está a executar como líder (deteta a reentrada)
+_leading: ContextVar[frozenset] = ContextVar("wisein_single_flight_leading", default=frozenset())
+
+# Partilhado pelo processo: todas as sessões e lotes que geram o mesmo tópico fazem uma só chamada ao modelo
+GENERATION_FLIGHT = SingleFlight()
+
+def topic_key(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+async def with_backoff(fn: Callable[[], Awaitable[Any]], max_retries: int = 3, base_delay: float = 1.0,
+                       max_delay: float = 30.0) -> Any:
+    """Repete fn() em erros 429 com backoff exponencial + jitter; outros erros propagam logo."""
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * (0.5 + random.random() / 2)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def generate_for_topics(topics: List[str], fetch_fn: Callable[[str], Awaitable[Any]], max_concurrency: int = 4,
+                              max_retries: int = 3, base_delay: float = 1.0, metrics_logger=None,
+                              single_flight: Optional[SingleFlight] = None) -> Dict[str, Any]:
+    """Gera perguntas para vários tópicos em paralelo, com no máximo max_concurrency chamadas ao modelo.
+
+    Tópicos repetidos (no lote ou noutros lotes/sessões em curso) partilham a chamada via GENERATION_FLIGHT.
+    Devolve {tópico: resultado de fetch_fn, ou a exceção final}.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    single_flight = single_flight or GENERATION_FLIGHT
+
+    async def run_one(topic: str) -> Any:
+        async with semaphore:
+            start_time = time.time()
+            success = False
+            try:
+                result = await with_backoff(lambda: fetch_fn(topic), max_retries=max_retries, base_delay=base_delay)
+                success = bool(result)
+                return result
+            finally:
+                if metrics_logger:
+                    metrics_logger.log_generation_latency(topic, time.time() - start_time, success)
+
+    async def run_dedup(topic: str) -> Any:
+        return await single_flight.do(topic_key(topic), lambda: run_one(topic))
+
+    results = await asyncio.gather(*(run_dedup(topic) for topic in topics), return_exceptions=True)
+    return dict(zip(topics, results))
@@ -0,0 +1,238 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import List, Dict, Optional, Any, Callable, Sequence, Tuple
+
+try:
+    from logic.csp_quiz import QuizCSP
+    from logic.adversarial import InterviewGame
+    from logic.question import to_records
+    from logic.tracing import TRACER
+except ImportError:
+    from csp_quiz import QuizCSP
+    from adversarial import InterviewGame
+    from question import to_records
+    from tracing import TRACER
+
+LEVELS = ('easy', 'medium', 'hard')
+TYPES = ('multiple_choice', 'true_false', 'code_completion')
+CATEGORIES = ('vocab', 'grammar')
+
+DEFAULT_LEVEL_WEIGHTS = (0.4, 0.4, 0.2)
+DEFAULT_TYPE_WEIGHTS = (0.6, 0.2, 0.2)
+DEFAULT_GRAMMAR_RATIO = 0.3
+
+def make_pool(size: int, topics: Sequence[str] = ('python',), level_weights: Sequence[float] = DEFAULT_LEVEL_WEIGHTS,
+              type_weights: Sequence[float] = DEFAULT_TYPE_WEIGHTS, grammar_ratio: float = DEFAULT_GRAMMAR_RATIO,
+              seed: int = 0) -> List[Dict[str, Any]]:
+    """Pool sintético e reprodutível (mesma seed = mesmo pool) com as distribuições pedidas."""
+    rng = random.Random(seed)
+    levels = rng.choices(LEVELS, weights=level_weights, k=size)
+    types = rng.choices(TYPES, weights=type_weights, k=size)
+    return [
+        {
+            'id': i + 1,
+            'topic': topics[i % len(topics)],
+            'level': levels[i],
+            'type': types[i],
+            'category': 'grammar' if rng.random() < grammar_ratio else 'vocab',
+        }
+        for i in range(size)
+    ]
+
+def constraint_scenarios(quiz_size: int, topic: str = 'python') -> Dict[str, Dict[str, Any]]:
+    """Restrições típicas da UI e dois casos insatisfazíveis (tópico sem perguntas e mais difíceis do que o tamanho)."""
+    return {
+        'plan': {'size': quiz_size, 'topic': topic, 'max_mc': max(quiz_size // 2, 1), 'min_hard': 1, 'min_grammar': 1},
+        'tight': {'size': quiz_size, 'topic': topic, 'max_mc': 0, 'min_hard': quiz_size // 2,
+                  'min_grammar': quiz_size // 2},
+        'unsat_topic': {'size': quiz_size, 'topic': '__inexistente__'},
+        'unsat_hard': {'size': quiz_size, 'topic': topic, 'min_hard': quiz_size + 1},
+    }
+
+def measure(fn: Callable[[], Tuple[Any, Dict[str, Any]]], repeats: int = 3) -> Dict[str, Any]:
+    """Mediana do tempo de parede em `repeats` execuções; pico de memória numa execução à parte (tracemalloc abranda)."""
+    timings = []
+    stats = {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, stats = fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_ms": statistics.median(timings) * 1000,
+        "time_min_ms": min(timings) * 1000,
+        "peak_kb": peak / 1024,
+        "stats": stats,
+    }
+
+def bench_csp(pool_sizes: Sequence[int], quiz_sizes: Sequence[int], repeats: int = 3, best_of: int = 20,
+              records: bool = False, seed: int = 0, distribution: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """distribution: kwargs de make_pool (level_weights, type_weights, grammar_ratio)."""
+    results = []
+    for pool_size in pool_sizes:
+        pool = make_pool(pool_size, topics=('python', 'sql'), seed=seed, **(distribution or {}))
+        if records:
+            pool = to_records(pool)
+        for quiz_size in quiz_sizes:
+            for scenario, constraints in constraint_scenarios(quiz_size).items():
+                runs = {
+                    "solve_indexed": lambda: QuizCSP(pool, constraints).solve_indexed(),
+                    f"best_of_{best_of}": lambda: QuizCSP(pool, constraints).best_of(best_of),
+                }
+                for solver, fn in runs.items():
+                    m = measure(fn, repeats)
+                    results.append({
+                        "engine": "csp",
+                        "solver": solver,
+                        "pool_size": pool_size,
+                        "quiz_size": quiz_size,
+                        "scenario": scenario,
+                        "success": m["stats"].get("success"),
+                        "steps": m["stats"].get("steps_explored"),
+                        "time_ms": m["time_ms"],
+                        "time_min_ms": m["time_min_ms"],
+                        "peak_kb": m["peak_kb"],
+                    })
+    return results
+
+def bench_adversarial(pool_sizes: Sequence[int], depths: Sequence[int], repeats: int = 3,
+                      history_ratio: float = 0.1, records: bool = False, seed: int = 0,
+                      max_deep_pool: int = 500, distribution: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Acima da forma fechada (depth > 2) a árvore cresce com pool_size², por isso só corre até max_deep_pool."""
+    results = []
+    for pool_size in pool_sizes:
+        pool = make_pool(pool_size, seed=seed, **(distribution or {}))
+        if records:
+            pool = to_records(pool)
+        history = random.Random(seed).sample([q['id'] for q in pool], int(pool_size * history_ratio))
+        for depth in depths:
+            if depth > 2 and pool_size > max_deep_pool:
+                continue
+            m = measure(lambda: InterviewGame(pool, history).get_best_next_question(depth=depth), repeats)
+            results.append({
+                "engine": "adversarial",
+                "solver": m["stats"].get("algorithm", "minimax"),
+                "pool_size": pool_size,
+                "depth": depth,
+                "nodes": m["stats"].get("nodes_visited"),
+                "pruned": m["stats"].get("nodes_pruned"),
+                "tt_hits": m["stats"].get("tt_hits"),
+                "time_ms": m["time_ms"],
+                "time_min_ms": m["time_min_ms"],
+                "peak_kb": m["peak_kb"],
+            })
+    return results
+
+def _key(row: Dict[str, Any]) -> Tuple:
+    return (row["engine"], row["solver"], row["pool_size"], row.get("quiz_size"), row.get("scenario"), row.get("depth"))
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Junta a cada linha o rácio de tempo face a uma execução anterior (>1 = mais lento)."""
+    previous = {_key(row): row for row in baseline}
+    for row in current:
+        old = previous.get(_key(row))
+        if old and old.get("time_ms"):
+            row["vs_baseline"] = row["time_ms"] / old["time_ms"]
+    return current
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    if not rows:
+        return ""
+    columns = [c for c in ("solver", "pool_size", "quiz_size", "scenario", "depth", "success", "steps", "nodes",
+                           "pruned", "time_ms", "peak_kb", "vs_baseline") if any(c in row for row in rows)]
+
+    def cell(value):
+        if isinstance(value, float):
+            return f"{value:.3f}"
+        return "" if value is None else str(value)
+
+    table = [columns] + [[cell(row.get(c)) for c in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    lines = ["  ".join(value.rjust(width) for value, width in zip(line, widths)) for line in table]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Os spans amostrados escreveriam para disco a meio das medições
+    TRACER.sample_rate = 0.0
+
+    distribution = {
+        "level_weights": list(args.level_weights),
+        "type_weights": list(args.type_weights),
+        "grammar_ratio": args.grammar_ratio,
+    }
+    results = []
+    if args.engine in ("csp", "all"):
+        results += bench_csp(args.pool_sizes, args.quiz_sizes, args.repeats, args.best_of, args.records, args.seed,
+                             distribution=distribution)
+    if args.engine in ("adversarial", "all"):
+        results += bench_adversarial(args.pool_sizes, args.depths, args.repeats, records=args.records, seed=args.seed,
+                                     max_deep_pool=args.max_deep_pool, distribution=distribution)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f)["results"])
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+            "records": args.records,
+            "seed": args.seed,
+            "max_deep_pool": args.max_deep_pool,
+            "distribution": distribution,
+        },
+        "results": results,
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark do QuizCSP e do InterviewGame com pools sintéticos.")
+    parser.add_argument("--engine", choices=("csp", "adversarial", "all"), default="all")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--quiz-sizes", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--depths", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--max-deep-pool", type=int, default=500,
+                        help="Maior pool onde o Minimax corre com depth > 2.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--best-of", type=int, default=20)
+    parser.add_argument("--records", action="store_true", help="Usa registos Question em vez de dicts.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--level-weights", type=float, nargs=3, default=list(DEFAULT_LEVEL_WEIGHTS),
+                        metavar=LEVELS, help="Pesos dos níveis no pool sintético.")
+    parser.add_argument("--type-weights", type=float, nargs=3, default=list(DEFAULT_TYPE_WEIGHTS),
+                        metavar=TYPES, help="Pesos dos tipos no pool sintético.")
+    parser.add_argument("--grammar-ratio", type=float, default=DEFAULT_GRAMMAR_RATIO,
+                        help="Fração de perguntas de categoria 'grammar'.")
+    parser.add_argument("--json", dest="json_path", help="Grava os resultados em JSON neste caminho.")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar tempos.")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    for engine in ("csp", "adversarial"):
+        rows = [row for row in report["results"] if row["engine"] == engine]
+        if rows:
+            print(f"\n== {engine} ==")
+            print(format_table(rows))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados gravados em {args.json_path}")
+
+if __name__ == "__main__":
+    main()
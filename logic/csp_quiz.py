@@ -1,5 +1,41 @@
+import heapq
+import threading
 import time
-from typing import List, Dict, Optional, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple, Callable, Iterator
+
+try:
+    from logic.question import Question, HARD as HARD_LEVEL, MULTIPLE_CHOICE, GRAMMAR as GRAMMAR_CATEGORY
+    from logic.tracing import traced
+except ImportError:
+    from question import Question, HARD as HARD_LEVEL, MULTIPLE_CHOICE, GRAMMAR as GRAMMAR_CATEGORY
+    from tracing import traced
+
+# Flags usadas pelo solver indexado: cada pergunta cai numa de 8 classes
+HARD, MC, GRAMMAR = 1, 2, 4
+
+# Registos Question comparam códigos inteiros; dicts mantêm a comparação por string
+def _is_hard(q) -> bool:
+    if type(q) is Question:
+        return q.level_code == HARD_LEVEL
+    return q.get('level') == 'hard'
+
+def _is_mc(q) -> bool:
+    if type(q) is Question:
+        return q.type_code == MULTIPLE_CHOICE
+    return q.get('type') == 'multiple_choice'
+
+def _is_grammar(q) -> bool:
+    if type(q) is Question:
+        return q.category_code == GRAMMAR_CATEGORY
+    return q.get('category') == 'grammar'
+
+def difficulty_spread(quiz: List[Dict]) -> float:
+    """Pontuação padrão do best_of: quantos níveis distintos, desempate pela variedade de tipos."""
+    levels = {q.get('level') for q in quiz}
+    types = {q.get('type') for q in quiz}
+    return len(levels) + 0.1 * len(types)
 
 class QuizCSP:
     def __init__(self, question_pool: List[Dict[str, Any]], constraints: Dict[str, Any]):
@@ -7,6 +43,14 @@ class QuizCSP:
         self.constraints = constraints
         self.solution = []
         self.steps_count = 0
+        self.index = None
+
+    @classmethod
+    def from_bank(cls, bank, constraints: Dict[str, Any]) -> "QuizCSP":
+        """Candidatos vêm do índice do QuestionBank em vez de um pool completo."""
+        if 'topic' in constraints:
+            return cls(bank.query(topic=constraints['topic']), constraints)
+        return cls(bank.all(), constraints)
 
     def is_valid(self, candidate_question):
         # 1. Duplicidade
@@ -23,26 +67,27 @@ class QuizCSP:
             return False
         
         # 4. Variedade 
-        if 'max_mc' in self.constraints and candidate_question.get('type') == 'multiple_choice':
-            count_mc = sum(1 for q in self.solution if q.get('type') == 'multiple_choice')
+        if 'max_mc' in self.constraints and _is_mc(candidate_question):
+            count_mc = sum(1 for q in self.solution if _is_mc(q))
             if count_mc >= self.constraints['max_mc']:
                 return False
 
         return True
 
     def check_final_goal(self):
-        count_hard = sum(1 for q in self.solution if q.get('level') == 'hard')
+        count_hard = sum(1 for q in self.solution if _is_hard(q))
         min_hard = self.constraints.get('min_hard', 0)
         if count_hard < min_hard:
             return False
 
         if 'min_grammar' in self.constraints:
-            count_grammar = sum(1 for q in self.solution if q.get('category') == 'grammar')
+            count_grammar = sum(1 for q in self.solution if _is_grammar(q))
             if count_grammar < self.constraints['min_grammar']:
                 return False
         
         return True
     
+    @traced()
     def solve(self) -> Tuple[Optional[List[Dict]], Dict[str, Any]]:
         start_time = time.time()
         self.steps_count = 0 
@@ -81,6 +126,297 @@ class QuizCSP:
 
         return None
 
+    def build_index(self) -> Dict[str, Dict[Any, List[int]]]:
+        """Indexa as posições do pool por topic/level/type/category."""
+        index = {'topic': {}, 'level': {}, 'type': {}, 'category': {}}
+        for pos, q in enumerate(self.pool):
+            for attr, buckets in index.items():
+                buckets.setdefault(q.get(attr), []).append(pos)
+        self.index = index
+        return index
+
+    @traced()
+    def solve_indexed(self) -> Tuple[Optional[List[Dict]], Dict[str, Any]]:
+        """Mesmo contrato de solve(), mas com índice, forward checking e ordenação MRV."""
+        start_time = time.time()
+        self.steps_count = 0
+        self.solution = []
+
+        if self.index is None:
+            self.build_index()
+        self._prepare_indexed_state()
+
+        result = None
+        if self._is_feasible():
+            result = next(self._indexed_solutions(), None)
+        self.solution = result if result is not None else []
+
+        end_time = time.time()
+        stats = {
+            "success": result is not None,
+            "time_seconds": end_time - start_time,
+            "steps_explored": self.steps_count,
+            "quiz_size": len(result) if result else 0,
+            "algorithm": "Backtracking (Indexado + Forward Checking + MRV)"
+        }
+        return result, stats
+
+    def iter_solutions(self, limit: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Gera quizzes válidos e distintos (como conjuntos) sem recomeçar a busca entre soluções."""
+        self.steps_count = 0
+        self.solution = []
+        if self.index is None:
+            self.build_index()
+        self._prepare_indexed_state()
+
+        if limit is not None and limit <= 0:
+            return
+        if not self._is_feasible():
+            return
+
+        for count, quiz in enumerate(self._indexed_solutions(), start=1):
+            yield quiz
+            if limit is not None and count >= limit:
+                return
+
+    @traced()
+    def best_of(self, n: int, score_fn: Callable[[List[Dict]], float] = difficulty_spread) -> Tuple[Optional[List[Dict]], Dict[str, Any]]:
+        """Avalia até n soluções do mesmo run e devolve a de maior score_fn."""
+        start_time = time.time()
+
+        best = None
+        best_score = None
+        evaluated = 0
+        for quiz in self.iter_solutions(limit=n):
+            evaluated += 1
+            score = score_fn(quiz)
+            if best is None or score > best_score:
+                best, best_score = quiz, score
+        self.solution = best if best is not None else []
+
+        end_time = time.time()
+        stats = {
+            "success": best is not None,
+            "time_seconds": end_time - start_time,
+            "steps_explored": self.steps_count,
+            "quiz_size": len(best) if best else 0,
+            "solutions_evaluated": evaluated,
+            "score": best_score,
+            "algorithm": f"Backtracking (Indexado, Melhor de {n})"
+        }
+        return best, stats
+
+    def _question_class(self, pos: int) -> int:
+        q = self.pool[pos]
+        cls = 0
+        if _is_hard(q):
+            cls |= HARD
+        if _is_mc(q):
+            cls |= MC
+        if _is_grammar(q):
+            cls |= GRAMMAR
+        return cls
+
+    def _prepare_indexed_state(self):
+        if 'topic' in self.constraints:
+            candidates = self.index['topic'].get(self.constraints['topic'], [])
+        else:
+            candidates = range(len(self.pool))
+
+        # Domínio por classe (posições em ordem do pool) e contadores incrementais
+        self._class_of = {}
+        self._domains = [[] for _ in range(8)]
+        for pos in candidates:
+            cls = self._question_class(pos)
+            self._class_of[pos] = cls
+            self._domains[cls].append(pos)
+        self._available = [len(d) for d in self._domains]
+        self._blocked = set()
+
+        self._target_size = self.constraints.get('size', 5)
+        self._max_mc = self.constraints.get('max_mc')
+        self._min_hard = self.constraints.get('min_hard', 0)
+        self._min_grammar = self.constraints.get('min_grammar', 0)
+        self._count_mc = 0
+        self._count_hard = 0
+        self._count_grammar = 0
+
+    def _mc_left(self) -> float:
+        if self._max_mc is None:
+            return float('inf')
+        return self._max_mc - self._count_mc
+
+    def _usable(self, flag: int) -> int:
+        """Perguntas ainda disponíveis com a flag, respeitando o limite de escolha múltipla."""
+        plain = sum(self._available[c] for c in range(8) if c & flag == flag and not c & MC)
+        mc = sum(self._available[c] for c in range(8) if c & flag == flag and c & MC)
+        return plain + min(mc, max(self._mc_left(), 0))
+
+    def _is_feasible(self) -> bool:
+        slots = self._target_size - len(self.solution)
+        if slots < 0 or self._mc_left() < 0:
+            return False
+
+        need_hard = max(0, self._min_hard - self._count_hard)
+        need_grammar = max(0, self._min_grammar - self._count_grammar)
+        if need_hard > slots or need_grammar > slots:
+            return False
+        if self._usable(0) < slots:
+            return False
+        if need_hard and self._usable(HARD) < need_hard:
+            return False
+        if need_grammar and self._usable(GRAMMAR) < need_grammar:
+            return False
+
+        # Perguntas hard+grammar contam para os dois mínimos ao mesmo tempo
+        if need_hard and need_grammar:
+            overlap = min(self._usable(HARD | GRAMMAR), need_hard, need_grammar)
+            if need_hard + need_grammar - overlap > slots:
+                return False
+        return True
+
+    def _select_domain(self) -> List[int]:
+        """MRV: escolhe o mínimo por cumprir com menos candidatos; senão, o domínio geral."""
+        allowed = [c for c in range(8) if not (c & MC) or self._mc_left() > 0]
+
+        options = []
+        if self._count_hard < self._min_hard:
+            options.append([c for c in allowed if c & HARD])
+        if self._count_grammar < self._min_grammar:
+            options.append([c for c in allowed if c & GRAMMAR])
+        if not options:
+            options.append(allowed)
+
+        classes = min(options, key=lambda cs: sum(self._available[c] for c in cs))
+        return list(heapq.merge(*(self._domains[c] for c in classes)))
+
+    def _apply(self, cls: int, delta: int):
+        if cls & MC:
+            self._count_mc += delta
+        if cls & HARD:
+            self._count_hard += delta
+        if cls & GRAMMAR:
+            self._count_grammar += delta
+
+    def _indexed_solutions(self) -> Iterator[List[Dict]]:
+        self.steps_count += 1
+
+        if len(self.solution) == self._target_size:
+            yield list(self.solution)
+            return
+
+        blocked_here = []
+        for pos in self._select_domain():
+            if pos in self._blocked:
+                continue
+            cls = self._class_of[pos]
+
+            self._blocked.add(pos)
+            self._available[cls] -= 1
+            self.solution.append(self.pool[pos])
+            self._apply(cls, 1)
+
+            if self._is_feasible():
+                yield from self._indexed_solutions()
+
+            self._apply(cls, -1)
+            self.solution.pop()
+
+            # A pergunta fica excluída nos ramos irmãos (evita repetir combinações)
+            blocked_here.append(pos)
+            if not self._is_feasible():
+                break
+
+        for pos in blocked_here:
+            self._blocked.discard(pos)
+            self._available[self._class_of[pos]] += 1
+
+class QuizPlanCache:
+    """Cache LRU de planos: chave = versão do pool + restrições normalizadas.
+
+    Pode ser partilhada entre threads (sessões): o lock protege só a LRU; a resolução corre fora dele.
+    """
+
+    def __init__(self, maxsize: int = 128, metrics_logger=None):
+        self.maxsize = maxsize
+        self.metrics_logger = metrics_logger
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_constraints(constraints: Dict[str, Any]) -> Tuple:
+        # Restrições equivalentes (ex.: min_grammar=0 vs ausente) geram a mesma chave
+        normalized = {'size': constraints.get('size', 5), 'min_hard': constraints.get('min_hard', 0),
+                      'min_grammar': constraints.get('min_grammar', 0)}
+        for key in ('topic', 'max_mc'):
+            if key in constraints:
+                normalized[key] = constraints[key]
+        return tuple(sorted(normalized.items()))
+
+    def get_or_solve(self, question_pool: List[Dict[str, Any]], pool_version: int, constraints: Dict[str, Any],
+                     variant: str = "indexed", solve_fn: Optional[Callable[[QuizCSP], Tuple]] = None) -> Tuple[Optional[List[Dict]], Dict[str, Any]]:
+        key = (pool_version, variant, self.normalize_constraints(constraints))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            self._report(True)
+            quiz, stats = entry
+            return quiz, dict(stats, cache_hit=True)
+
+        solver = QuizCSP(question_pool, constraints)
+        quiz, stats = solve_fn(solver) if solve_fn else solver.solve_indexed()
+
+        with self._lock:
+            self._entries[key] = (quiz, stats)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        self._report(False)
+        return quiz, dict(stats, cache_hit=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _report(self, hit: bool):
+        if self.metrics_logger:
+            self.metrics_logger.log_cache_access("quiz_plan", hit)
+
+# Pool partilhado por cada processo worker (enviado uma vez, no initializer)
+_WORKER_POOL = None
+_WORKER_SOLVER = None
+
+def _init_worker(question_pool: List[Dict[str, Any]]):
+    global _WORKER_POOL, _WORKER_SOLVER
+    _WORKER_POOL = question_pool
+    _WORKER_SOLVER = QuizCSP(question_pool, {})
+    _WORKER_SOLVER.build_index()
+
+def _solve_job(constraints: Dict[str, Any]) -> Tuple[Optional[List[Dict]], Dict[str, Any]]:
+    # O índice do pool é construído uma vez por worker e reutilizado em todos os jobs
+    solver = QuizCSP(_WORKER_POOL, constraints)
+    solver.index = _WORKER_SOLVER.index
+    return solver.solve_indexed()
+
+def solve_batch(question_pool: List[Dict[str, Any]], constraints_list: List[Dict[str, Any]],
+                max_workers: Optional[int] = None, chunksize: int = 1) -> List[Tuple[Optional[List[Dict]], Dict[str, Any]]]:
+    """Resolve vários conjuntos de restrições sobre o mesmo pool num pool de processos.
+
+    Devolve uma lista de (quiz, stats) pela mesma ordem de constraints_list.
+    """
+    if not constraints_list:
+        return []
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(question_pool,)) as executor:
+        return list(executor.map(_solve_job, constraints_list, chunksize=chunksize))
+
 if __name__ == "__main__":
     mock_pool = [
         {'id': 1, 'topic': 'python', 'level': 'easy', 'type': 'multiple_choice', 'category': 'vocab'},
@@ -98,4 +434,14 @@ if __name__ == "__main__":
         for q in quiz:
             print(q)
     else:
-        print("Falha.")
\ No newline at end of file
+        print("Falha.")
+
+    quiz, stats = QuizCSP(mock_pool, regras).solve_indexed()
+    print(f"Indexado: {'Sucesso' if quiz else 'Falha'} | Passos: {stats['steps_explored']}")
+
+    quiz, stats = QuizCSP(mock_pool, regras).best_of(10)
+    print(f"Melhor de {stats['solutions_evaluated']}: {[q['id'] for q in quiz] if quiz else None} | Score: {stats['score']}")
+
+    jobs = [regras, {'size': 2, 'topic': 'python', 'min_hard': 2}, {'size': 4, 'topic': 'AWS'}]
+    for quiz, stats in solve_batch(mock_pool, jobs, max_workers=2):
+        print(f"Batch: {'Sucesso' if quiz else 'Falha'} | Passos: {stats['steps_explored']}")
\ No newline at end of file
@@ -0,0 +1,211 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Any
+
+SAMPLE_LEVELS = ('easy', 'medium', 'hard')
+SAMPLE_TYPES = ('multiple_choice', 'true_false', 'code_completion')
+
+class FakeLLMServer:
+    """Servidor local compatível com /v1/chat/completions do OpenAI/OpenRouter, para testes de carga.
+
+    Simula latência (com jitter), erros 500 aleatórios e rajadas periódicas de 429:
+    nos primeiros `burst_length` segundos de cada janela de `burst_every` segundos todas as chamadas levam 429.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.3, jitter: float = 0.1,
+                 error_rate: float = 0.0, burst_every: float = 0.0, burst_length: float = 0.0,
+                 retry_after: float = 1.0, token_delay: float = 0.01, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "streamed": 0, "errors": 0, "rate_limited": 0}
+        self._started_at = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="FakeLLMServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _in_burst(self) -> bool:
+        if self.burst_every <= 0 or self.burst_length <= 0:
+            return False
+        return (time.monotonic() - self._started_at) % self.burst_every < self.burst_length
+
+    def _delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _fails(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def reply_for(self, messages: List[Dict[str, Any]]) -> str:
+        """Lote de perguntas em JSON para o gerador; texto curto para o router (com a linha INTENT=... se pedida)."""
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        if "technical quiz" in prompt.lower():
+            topic = prompt.split("'")[1] if prompt.count("'") >= 2 else "tech"
+            rng = random.Random(topic)
+            questions = [
+                {
+                    "id": 900 + i,
+                    "level": rng.choice(SAMPLE_LEVELS),
+                    "type": rng.choice(SAMPLE_TYPES),
+                    "category": "grammar" if i % 3 == 0 else "vocab",
+                    "q": f"Pergunta {i + 1} sobre {topic}?",
+                    "a": f"resposta {i + 1}",
+                    "ok": "Correto!",
+                    "nok": "Incorreto.",
+                }
+                for i in range(5)
+            ]
+            return "```json\n" + json.dumps(questions, ensure_ascii=False) + "\n```"
+        if "INTENT=" in system:
+            # Imitação simples do router LLM: entrevista se for pedida, senão quiz; tópico = última palavra com maiúscula
+            intent = "entrevista" if "entrevista" in prompt.lower() else "quiz"
+            names = [word.strip(",.?!") for word in prompt.split()[1:] if word[:1].isupper()]
+            return f"Claro! Vamos a isso.\nINTENT={intent}; TOPIC={names[-1] if names else 'nenhum'}"
+        return "Claro! Vamos a isso."
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    body = {}
+                server._count("requests")
+
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+
+                if server._in_burst():
+                    server._count("rate_limited")
+                    self._send_json(429, {"error": {"message": "Rate limit exceeded", "code": 429}},
+                                    {"Retry-After": str(server.retry_after)})
+                    return
+
+                time.sleep(server._delay())
+                if server._fails():
+                    server._count("errors")
+                    self._send_json(500, {"error": {"message": "Upstream error", "code": 500}})
+                    return
+
+                content = server.reply_for(body.get("messages", []))
+                model = body.get("model", "fake-model")
+                if body.get("stream"):
+                    server._count("streamed")
+                    self._send_stream(model, content, include_usage=bool(body.get("stream_options")))
+                else:
+                    server._count("ok")
+                    self._send_json(200, completion(model, content))
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model: str, content: str, include_usage: bool):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                try:
+                    for i in range(0, len(content), 16):
+                        self._send_event(chunk(chunk_id, model, {"content": content[i:i + 16]}))
+                        time.sleep(server.token_delay)
+                    self._send_event(chunk(chunk_id, model, {}, finish_reason="stop"))
+                    if include_usage:
+                        usage_chunk = chunk(chunk_id, model, None)
+                        usage_chunk["usage"] = usage(content)
+                        self._send_event(usage_chunk)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send_event(self, payload: Dict[str, Any]):
+                self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def usage(content: str) -> Dict[str, int]:
+    tokens = max(1, len(content) // 4)
+    return {"prompt_tokens": 10, "completion_tokens": tokens, "total_tokens": 10 + tokens}
+
+def completion(model: str, content: str) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage(content),
+    }
+
+def chunk(chunk_id: str, model: str, delta: Optional[Dict[str, Any]], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+    choices = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    return {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": choices}
+
+
+if __name__ == "__main__":
+    with FakeLLMServer(port=8089, burst_every=30, burst_length=5) as fake:
+        print(f"Servidor falso em {fake.base_url} (Ctrl+C para terminar)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(fake.stats)
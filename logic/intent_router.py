@@ -0,0 +1,180 @@
+import re
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+QUIZ, INTERVIEW, NEWS = "quiz", "interview", "news"
+
+# Peso 1.0 = palavra que decide sozinha; 0.5 = sinal fraco (ex.: "pergunta" também aparece em pedidos de quiz)
+INTENT_KEYWORDS = {
+    QUIZ: {"quiz": 1.0, "quizz": 1.0, "plano": 1.0, "plano de estudo": 1.0, "questionario": 1.0,
+           "teste": 0.5, "exame": 0.5},
+    INTERVIEW: {"entrevista": 1.0, "interview": 1.0, "mock interview": 1.0, "pergunta": 0.5, "perguntas": 0.5},
+    NEWS: {"noticia": 1.0, "noticias": 1.0, "news": 1.0, "novidades": 1.0},
+}
+
+# Vocabulário base; os tópicos do QuestionBank são acrescentados em sync_topics
+TECH_TOPICS = [
+    "python", "java", "javascript", "typescript", "c", "c++", "c#", "go", "rust", "kotlin", "sql", "nosql",
+    "aws", "azure", "gcp",
+    "docker", "kubernetes", "linux", "git", "react", "angular", "django", "flask", "spring", "node",
+    "machine learning", "deep learning", "data science", "devops", "redes", "seguranca",
+]
+
+STOPWORDS = {
+    "quero", "um", "uma", "quiz", "sobre", "de", "do", "da", "em", "para",
+    "plano", "entrevista", "teste", "gerar", "criar", "fazer", "agora", "rapido",
+}
+
+DEFAULT_TOPIC = "General Tech"
+GUESSED_TOPIC_SCORE = 0.5  # abaixo do limiar por omissão (0.6)
+
+# Instrução extra para o router LLM quando a decisão local não é confiável
+LLM_ROUTE_INSTRUCTIONS = (
+    "Seja breve. Na última linha escreva apenas: INTENT=<quiz|entrevista|noticias|nenhum>; TOPIC=<tópico|nenhum>"
+)
+_LLM_ROUTE_RE = re.compile(r"INTENT\s*=\s*(\w+)\s*;\s*TOPIC\s*=\s*(.+?)\s*$", re.IGNORECASE)
+_LLM_INTENTS = {"quiz": QUIZ, "entrevista": INTERVIEW, "interview": INTERVIEW, "noticias": NEWS, "news": NEWS}
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos: 'Notícias' e 'noticias' são a mesma palavra."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+_TOKEN_RE = re.compile(r"\w+(?:\+\+|#)?")
+
+def tokenize(text: str) -> List[str]:
+    # "C++" e "C#" continuam a ser tokens próprios (não "c")
+    return _TOKEN_RE.findall(fold(text))
+
+def format_topic(topic: str) -> str:
+    # Mesma regra de sempre da UI: siglas curtas em maiúsculas
+    return topic.capitalize() if len(topic) > 3 else topic.upper()
+
+
+class PhraseTrie:
+    """Trie por tokens: encontra expressões de várias palavras ("machine learning") numa só passagem."""
+
+    _END = object()
+
+    def __init__(self, phrases: Iterable[Tuple[str, Any]] = ()):
+        self._root: Dict[Any, Any] = {}
+        for phrase, value in phrases:
+            self.add(phrase, value)
+
+    def add(self, phrase: str, value: Any):
+        node = self._root
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node[self._END] = value
+
+    def matches(self, tokens: List[str]) -> List[Tuple[int, int, Any]]:
+        """(início, fim, valor) do match mais longo em cada posição, sem sobreposições."""
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if self._END in node:
+                    best = (i, j, node[self._END])
+            if best:
+                found.append(best)
+                i = best[1]
+            else:
+                i += 1
+        return found
+
+
+class IntentRouter:
+    """Decide intenção e tópico localmente (microssegundos); só pede o LLM quando a confiança é baixa.
+
+    confiança = força da intenção (1.0 se só uma intenção forte) × certeza do tópico
+    (1.0 se está no vocabulário, 0.5 pela heurística da última palavra, 0.3 sem tópico).
+    Um tópico só adivinhado fica abaixo do limiar: confirma-o o LLM.
+    """
+
+    def __init__(self, threshold: float = 0.6, topics: Iterable[str] = (), metrics_logger=None):
+        self.threshold = threshold
+        self.metrics_logger = metrics_logger
+        self._intents = PhraseTrie((phrase, (intent, weight))
+                                   for intent, phrases in INTENT_KEYWORDS.items()
+                                   for phrase, weight in phrases.items())
+        self._keyword_tokens = {token for phrases in INTENT_KEYWORDS.values() for phrase in phrases
+                                for token in tokenize(phrase)}
+        self._topics_version = None
+        self._topics = PhraseTrie()
+        self.sync_topics(topics)
+
+    def sync_topics(self, topics: Iterable[str], version: Optional[int] = None):
+        """Reconstrói o vocabulário de tópicos (base + banco) quando a versão do banco muda.
+
+        Um tópico do banco devolve a grafia do banco ('python', não 'Python'): a UI filtra o pool por igualdade exata.
+        """
+        if version is not None and version == self._topics_version:
+            return
+        vocabulary: Dict[str, str] = {}
+        for topic in topics:
+            vocabulary.setdefault(fold(topic), topic)
+        for topic in TECH_TOPICS:
+            vocabulary.setdefault(fold(topic), format_topic(topic))
+        self._topics = PhraseTrie(vocabulary.items())
+        self._topics_version = version
+
+    def route(self, text: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        tokens = tokenize(text)
+
+        weights: Dict[str, float] = {}
+        for _, _, (intent, weight) in self._intents.matches(tokens):
+            weights[intent] = max(weights.get(intent, 0.0), weight)
+        ranked = sorted(weights.items(), key=lambda item: -item[1])
+        intent, intent_score = None, 0.0
+        if ranked:
+            intent, best = ranked[0]
+            second = ranked[1][1] if len(ranked) > 1 else 0.0
+            intent_score = best * best / (best + second)  # sinal fraco sozinho fica abaixo do limiar
+
+        known = self._topics.matches(tokens)
+        if known:
+            topic, topic_score = known[-1][2], 1.0
+        else:
+            candidates = [t for t in tokens if t not in STOPWORDS and t not in self._keyword_tokens]
+            topic, topic_score = (format_topic(candidates[-1]), GUESSED_TOPIC_SCORE) if candidates else (None, 0.3)
+
+        confidence = intent_score * topic_score
+        decision = {
+            "intent": intent,
+            "topic": topic or DEFAULT_TOPIC,
+            "confidence": confidence,
+            "use_llm": confidence < self.threshold,
+            "seconds": time.perf_counter() - start,
+        }
+        if self.metrics_logger:
+            self.metrics_logger.log_router_decision("llm" if decision["use_llm"] else "local", decision["seconds"])
+        return decision
+
+    @staticmethod
+    def parse_llm_route(text: str) -> Tuple[str, Optional[str], Optional[str]]:
+        """Separa a linha INTENT=...; TOPIC=... da resposta do LLM: (texto sem a linha, intenção, tópico)."""
+        lines = (text or "").rstrip().splitlines()
+        if not lines:
+            return text, None, None
+        match = _LLM_ROUTE_RE.search(lines[-1])
+        if not match:
+            return text, None, None
+        intent = _LLM_INTENTS.get(fold(match.group(1)))
+        topic = match.group(2).strip().strip(".\"'")
+        if fold(topic) in ("nenhum", "none", ""):
+            topic = None
+        return "\n".join(lines[:-1]).rstrip(), intent, format_topic(topic) if topic else None
+
+
+if __name__ == "__main__":
+    router = IntentRouter(topics=["python", "AWS"])
+    for text in ["Quero um quiz de Python", "Estou pronto para a entrevista de machine learning",
+                 "Notícias sobre AWS", "Quero um quiz", "Olá, tudo bem?", "quiz com perguntas de java"]:
+        print(f"{text!r}: {router.route(text)}")
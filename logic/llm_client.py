@@ -0,0 +1,276 @@
+import asyncio
+import atexit
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, AsyncIterator, Coroutine, Dict, List, Optional
+
+# autogen/openai/httpx demoram ~2 s a importar: só são carregados no thread do manager, no 1º uso
+if TYPE_CHECKING:
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """429 do OpenRouter/OpenAI, venha como openai.RateLimitError ou embrulhado noutra exceção."""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    return '429' in str(error) or 'rate limit' in str(error).lower()
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+class CircuitOpenError(RuntimeError):
+    """O circuito está aberto: a chamada é recusada de imediato (usar o Modo Offline)."""
+
+
+class CircuitBreaker:
+    """Abre após `failure_threshold` falhas seguidas (erros, 429, timeouts) e passa a recusar chamadas na hora.
+
+    Passados `reset_timeout` segundos fica meio-aberto: uma única sonda em fundo decide se fecha
+    ou se volta a abrir, com a espera a duplicar até `max_reset_timeout`.
+    """
+
+    def __init__(self, name: str = "llm", failure_threshold: int = 3, reset_timeout: float = 15.0,
+                 max_reset_timeout: float = 120.0, metrics_logger=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.metrics_logger = metrics_logger
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self._open_timeout = reset_timeout
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            self.rejected += 1
+        if self.metrics_logger:
+            self.metrics_logger.log_circuit_rejection(self.name)
+        return False
+
+    def ready_for_probe(self) -> bool:
+        """True (uma só vez) quando o circuito aberto já esperou o suficiente; passa a meio-aberto."""
+        with self._lock:
+            if self.state != OPEN or time.monotonic() - self._opened_at < self._open_timeout:
+                return False
+            self.state = HALF_OPEN
+        self._notify()
+        return True
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != HALF_OPEN:
+                return
+            self.state = CLOSED
+            self._open_timeout = self.reset_timeout
+        self._notify()
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._open_timeout = min(self._open_timeout * 2, self.max_reset_timeout)
+            elif self.state == OPEN or self.consecutive_failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+        self._notify()
+
+    def _notify(self):
+        if self.metrics_logger:
+            self.metrics_logger.log_circuit_state(self.name, self.state)
+
+
+class LLMClientManager:
+    """Um único OpenAIChatCompletionClient por processo, com pool de ligações keep-alive.
+
+    O cliente vive num event loop próprio (thread de fundo): cada asyncio.run() do
+    Streamlit cria um loop novo, e ligações httpx não podem ser partilhadas entre loops.
+    """
+
+    def __init__(self, client_config: Dict[str, Any], max_connections: int = 20,
+                 max_keepalive_connections: int = 10, keepalive_expiry: float = 30.0, timeout: float = 60.0,
+                 failure_threshold: int = 3, reset_timeout: float = 15.0, max_reset_timeout: float = 120.0,
+                 probe_timeout: float = 10.0):
+        self.client_config = client_config
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout,
+                                      max_reset_timeout=max_reset_timeout)
+        self.probe_timeout = probe_timeout
+        self.limits = {"max_connections": max_connections,
+                       "max_keepalive_connections": max_keepalive_connections,
+                       "keepalive_expiry": keepalive_expiry}
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="LLMClientLoop", daemon=True)
+        self._thread.start()
+
+    def _get_client(self) -> "OpenAIChatCompletionClient":
+        # Só é chamado dentro do loop do manager
+        if self._client is None:
+            import httpx
+            from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+            http_client = httpx.AsyncClient(limits=httpx.Limits(**self.limits), timeout=self.timeout)
+            self._client = OpenAIChatCompletionClient(**self.client_config, http_client=http_client)
+        return self._client
+
+    def _check_circuit(self):
+        if self.breaker.ready_for_probe():
+            self.submit(self._probe())
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuito do LLM aberto ({self.breaker.consecutive_failures} falhas seguidas).")
+
+    async def _probe(self):
+        from autogen_core.models import UserMessage
+
+        # Chamada mínima (1 token) só para saber se o fornecedor já responde
+        try:
+            await asyncio.wait_for(
+                self._get_client().create([UserMessage(content="ping", source="probe")],
+                                          extra_create_args={"max_tokens": 1}),
+                timeout=self.probe_timeout
+            )
+        except Exception:
+            self._record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _record_failure(self):
+        # Erros causados pelo próprio encerramento (tarefas canceladas, cliente a fechar) não são do fornecedor
+        if not self._closed:
+            self.breaker.record_failure()
+
+    async def _guarded(self, coro: Coroutine, timeout: Optional[float] = None):
+        """Erros e timeouts contam como falha; um cancelamento vindo de fora (encerramento) não conta."""
+        try:
+            result = await asyncio.wait_for(coro, timeout=timeout)
+        except Exception:
+            self._record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _run_agent(self, task: str, name: str, system_message: Optional[str], tools: Optional[List]):
+        from autogen_agentchat.agents import AssistantAgent
+
+        kwargs = {"name": name, "model_client": self._get_client()}
+        if system_message:
+            kwargs["system_message"] = system_message
+        if tools:
+            kwargs["tools"] = tools
+        agent = AssistantAgent(**kwargs)
+        return await agent.run(task=task)
+
+    async def run_agent(self, task: str, name: str = "WiseIn", system_message: Optional[str] = None,
+                        tools: Optional[List] = None, timeout: Optional[float] = None):
+        """Corre um AssistantAgent com o cliente partilhado; pode ser chamado a partir de qualquer loop.
+
+        O timeout é aplicado no loop do manager (asyncio.TimeoutError), para o breaker o contar como falha.
+        """
+        if self._closed:
+            raise RuntimeError("LLMClientManager já foi encerrado.")
+        self._check_circuit()
+        future = asyncio.run_coroutine_threadsafe(
+            self._guarded(self._run_agent(task, name, system_message, tools), timeout), self._loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def warm_up(self) -> Future:
+        """Importa o stack do LLM e cria o cliente em fundo, para a 1ª chamada não pagar esse custo."""
+        async def build():
+            self._get_client()
+        return self.submit(build())
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Agenda uma corrotina no loop do manager (continua a correr depois de o asyncio.run do chamador acabar)."""
+        if self._closed:
+            raise RuntimeError("LLMClientManager já foi encerrado.")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def stream_completion(self, task: str, system_message: Optional[str] = None,
+                                timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Tokens de texto à medida que chegam. Tem de ser consumido dentro do loop do manager (ver submit).
+
+        `timeout` limita o stream completo; ao expirar levanta asyncio.TimeoutError (conta como falha).
+        """
+        from autogen_core.models import SystemMessage, UserMessage
+
+        messages = []
+        if system_message:
+            messages.append(SystemMessage(content=system_message))
+        messages.append(UserMessage(content=task, source="user"))
+
+        self._check_circuit()
+        stream = self._get_client().create_stream(messages)
+        deadline = None if timeout is None else self._loop.time() + timeout
+        try:
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - self._loop.time())
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                if isinstance(chunk, str):
+                    yield chunk
+        except Exception:
+            self._record_failure()
+            raise
+        finally:
+            await stream.aclose()
+        self.breaker.record_success()
+
+    async def _shutdown(self):
+        # Streams ainda em fundo (ver submit) são cancelados antes de fechar o cliente
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if self._client is not None:
+            await self._client.close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+
+_MANAGERS: Dict[str, LLMClientManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+def get_client_manager(client_config: Dict[str, Any], **pool_options) -> LLMClientManager:
+    """Manager partilhado por processo para uma dada configuração de cliente."""
+    key = json.dumps(client_config, sort_keys=True, default=str)
+    with _MANAGERS_LOCK:
+        manager = _MANAGERS.get(key)
+        if manager is None or manager._closed:
+            manager = LLMClientManager(client_config, **pool_options)
+            _MANAGERS[key] = manager
+        return manager
+
+def shutdown_client_managers():
+    with _MANAGERS_LOCK:
+        managers = list(_MANAGERS.values())
+        _MANAGERS.clear()
+    for manager in managers:
+        manager.close()
+
+atexit.register(shutdown_client_managers)
@@ -1,13 +1,325 @@
+import bisect
 import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class MetricsLogger:
+# Buckets em segundos: do solver local (sub-ms) às chamadas ao LLM (dezenas de segundos)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 1000000)
+ROUTER_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+CIRCUIT_STATE_CODES = {"closed": 0, "half_open": 1, "open": 2}
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+    family_suffix = ""  # HELP/TYPE usam o nome das amostras (contadores: <nome>_total)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *labelvalues, **labelkwargs) -> "_Metric":
+        if labelkwargs:
+            labelvalues = tuple(str(labelkwargs[name]) for name in self.labelnames)
+        else:
+            labelvalues = tuple(str(value) for value in labelvalues)
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    self._children[labelvalues] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _samples(self):
+        if self.labelnames:
+            return [(values, child) for values, child in list(self._children.items())]
+        return [((), self)]
+
+    def render(self) -> str:
+        family = self.name + self.family_suffix
+        lines = [f"# HELP {family} {self.documentation}", f"# TYPE {family} {self.kind}"]
+        for labelvalues, child in self._samples():
+            lines.extend(child._render_sample(self.name, self.labelnames, labelvalues))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+    family_suffix = "_total"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def _render_sample(self, name, labelnames, labelvalues):
+        return [f"{name}_total{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def _render_sample(self, name, labelnames, labelvalues):
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        # Caminho de gravação: uma pesquisa binária e três somas
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimativa (interpolação linear dentro do bucket), como o histogram_quantile do Prometheus."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1] if self.buckets else None
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1] if self.buckets else None
+
+    def _render_sample(self, name, labelnames, labelvalues):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _format_value(float(bound)) + '"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(value_sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, labelvalues)} {total}")
+        return lines
+
+
+class MetricsRegistry:
     def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._server = None
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = cls(name, documentation, labelnames, **kwargs)
+                    self._metrics[name] = metric
+        if not isinstance(metric, cls):
+            raise ValueError(f"Métrica '{name}' já registada com outro tipo.")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Escreve o formato de texto do Prometheus (ex.: para o textfile collector do node_exporter)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port: int = 9464, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics num thread de fundo (uma vez por processo)."""
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            registry = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = registry.render_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((addr, port), MetricsHandler)
+            threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True).start()
+            return self._server
+
+
+# Registo partilhado pelo processo: todas as instâncias de MetricsLogger agregam aqui
+REGISTRY = MetricsRegistry()
+
+class MetricsLogger:
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
         self.logger = logging.getLogger("TechLinguaMetrics")
+        self.registry = registry or REGISTRY
+
+        self.csp_seconds = self.registry.histogram("wisein_csp_solve_seconds", "Tempo de resolução do CSP.")
+        self.csp_steps = self.registry.histogram("wisein_csp_steps", "Passos explorados pelo CSP.", buckets=COUNT_BUCKETS)
+        self.adversarial_seconds = self.registry.histogram("wisein_adversarial_decision_seconds", "Tempo de decisão do Minimax.")
+        self.adversarial_nodes = self.registry.histogram("wisein_adversarial_nodes_visited", "Nós visitados pelo Minimax.",
+                                                         buckets=COUNT_BUCKETS)
+        self.cache_hits = self.registry.counter("wisein_cache_hits", "Hits por cache (todas as sessões).", ("cache",))
+        self.cache_misses = self.registry.counter("wisein_cache_misses", "Misses por cache (todas as sessões).", ("cache",))
+        self.generation_seconds = self.registry.histogram("wisein_generation_seconds", "Latência da geração de perguntas por tópico.",
+                                                          ("status",))
+        self.llm_seconds = self.registry.histogram("wisein_llm_call_seconds", "Latência das chamadas ao LLM.", ("agent", "status"))
+        self.circuit_state = self.registry.gauge("wisein_llm_circuit_state",
+                                                 "Estado do circuit breaker do LLM (0=fechado, 1=meio-aberto, 2=aberto).",
+                                                 ("client",))
+        self.app_import_seconds = self.registry.histogram("wisein_app_import_seconds",
+                                                          "Tempo de imports do app_ui por rerun.", ("run",))
+        self.app_first_paint_seconds = self.registry.histogram("wisein_app_first_paint_seconds",
+                                                               "Do início do rerun ao histórico desenhado.", ("run",))
+        self.circuit_rejections = self.registry.counter("wisein_llm_circuit_rejections",
+                                                        "Chamadas ao LLM recusadas com o circuito aberto.", ("client",))
+        self.router_decisions = self.registry.counter("wisein_router_decisions",
+                                                      "Decisões do router por origem (local = sem chamada ao LLM).",
+                                                      ("source",))
+        self.router_seconds = self.registry.histogram("wisein_router_local_seconds",
+                                                      "Tempo da classificação local de intenção e tópico.",
+                                                      buckets=ROUTER_BUCKETS)
+        self.router_saved_seconds = self.registry.counter("wisein_router_llm_seconds_saved",
+                                                          "Estimativa do tempo de LLM poupado pelo router local.")
 
     def log_csp_efficiency(self, time_seconds, steps):
+        self.csp_seconds.observe(time_seconds)
+        self.csp_steps.observe(steps)
         self.logger.info(f"[METRIC - CSP] Tempo: {time_seconds:.4f}s | Passos Explorados: {steps}")
 
     def log_adversarial_decision(self, time_seconds, nodes_visited):
-        self.logger.info(f"[METRIC - ADVERSARIAL] Tempo: {time_seconds:.4f}s | Nós Visitados: {nodes_visited}")
\ No newline at end of file
+        self.adversarial_seconds.observe(time_seconds)
+        self.adversarial_nodes.observe(nodes_visited)
+        self.logger.info(f"[METRIC - ADVERSARIAL] Tempo: {time_seconds:.4f}s | Nós Visitados: {nodes_visited}")
+
+    def log_cache_access(self, cache_name, hit):
+        # Um inc() por acesso: os contadores somam todas as sessões do processo
+        (self.cache_hits if hit else self.cache_misses).labels(cache_name).inc()
+        hits = int(self.cache_hits.labels(cache_name).value)
+        misses = int(self.cache_misses.labels(cache_name).value)
+        total = hits + misses
+        hit_rate = hits / total if total else 0.0
+        self.logger.info(f"[METRIC - CACHE] {cache_name} | Hits: {hits} | Misses: {misses} | Taxa: {hit_rate:.1%}")
+
+    def log_generation_latency(self, topic, time_seconds, success):
+        status = "OK" if success else "FALHA"
+        self.generation_seconds.labels("ok" if success else "error").observe(time_seconds)
+        self.logger.info(f"[METRIC - GERAÇÃO] Tópico: {topic} | Tempo: {time_seconds:.3f}s | Status: {status}")
+
+    def log_llm_call(self, agent_name, time_seconds, success):
+        self.llm_seconds.labels(agent_name, "ok" if success else "error").observe(time_seconds)
+        self.logger.info(f"[METRIC - LLM] Agente: {agent_name} | Tempo: {time_seconds:.3f}s | Status: {'OK' if success else 'FALHA'}")
+
+    def log_circuit_state(self, client_name, state):
+        self.circuit_state.labels(client_name).set(CIRCUIT_STATE_CODES.get(state, -1))
+        self.logger.info(f"[METRIC - CIRCUIT] Cliente: {client_name} | Estado: {state}")
+
+    def log_circuit_rejection(self, client_name):
+        self.circuit_rejections.labels(client_name).inc()
+
+    def log_router_decision(self, source, time_seconds, llm_agent="WiseIn"):
+        self.router_decisions.labels(source).inc()
+        self.router_seconds.observe(time_seconds)
+        if source == "local":
+            # Poupança estimada pela latência média das chamadas bem-sucedidas ao router LLM
+            llm = self.llm_seconds.labels(llm_agent, "ok")
+            if llm.count:
+                self.router_saved_seconds.inc(llm.sum / llm.count)
+        local = self.router_decisions.labels("local").value
+        total = local + self.router_decisions.labels("llm").value
+        self.logger.info(f"[METRIC - ROUTER] Origem: {source} | Tempo: {time_seconds * 1e6:.0f}µs | "
+                         f"Taxa local: {local / total:.1%} | LLM poupado: {self.router_saved_seconds.value:.1f}s")
+
+    def log_app_render(self, run_kind, import_seconds, first_paint_seconds):
+        self.app_import_seconds.labels(run_kind).observe(import_seconds)
+        self.app_first_paint_seconds.labels(run_kind).observe(first_paint_seconds)
+        self.logger.info(f"[METRIC - STARTUP] Run: {run_kind} | Imports: {import_seconds:.3f}s | First paint: {first_paint_seconds:.3f}s")
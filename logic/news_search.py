@@ -0,0 +1,194 @@
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+_SCRIPT_RE = re.compile(r"<(script|style)\b.*?</\1>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_CANONICAL_RE = re.compile(r"<link[^>]+rel=[\"']canonical[\"'][^>]*href=[\"']([^\"']+)[\"']", re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    """'  Notícias de  Python!' e 'notícias de python' partilham a mesma entrada na cache."""
+    return " ".join(_TOKEN_RE.findall(query.lower()))
+
+def _tokens(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1]
+
+
+class GoogleSearchBackend:
+    """googlesearch-python (bloqueante; a NewsSearcher corre-o num thread)."""
+
+    def __init__(self, num_results: int = 2, lang: str = "en"):
+        self.num_results = num_results
+        self.lang = lang
+
+    def search(self, query: str) -> List[str]:
+        from googlesearch import search  # import lento, só no 1º uso
+
+        return list(search(query, num_results=self.num_results, lang=self.lang))
+
+
+class LocalIndexBackend:
+    """Pesquisa offline sobre páginas guardadas numa pasta (.html, .htm, .txt, .md).
+
+    O índice invertido é construído no 1º pedido. Cada página é identificada pelo seu
+    <link rel="canonical"> quando existe, senão pelo caminho do ficheiro.
+    """
+
+    EXTENSIONS = ('.html', '.htm', '.txt', '.md')
+
+    def __init__(self, directory: str, num_results: int = 2):
+        self.directory = directory
+        self.num_results = num_results
+        self._postings: Optional[Dict[str, Dict[str, int]]] = None
+        self._documents = 0
+        self._lock = threading.Lock()
+
+    def _build(self):
+        postings: Dict[str, Dict[str, int]] = {}
+        documents = 0
+        for root, _, files in os.walk(self.directory):
+            for name in sorted(files):
+                if not name.lower().endswith(self.EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, encoding="utf-8", errors="ignore") as f:
+                    text = f.read()
+                source = path
+                if name.lower().endswith(('.html', '.htm')):
+                    canonical = _CANONICAL_RE.search(text)
+                    if canonical:
+                        source = canonical.group(1)
+                    text = _TAG_RE.sub(" ", _SCRIPT_RE.sub(" ", text))
+                documents += 1
+                for token, count in Counter(_tokens(text)).items():
+                    postings.setdefault(token, {})[source] = count
+        self._postings, self._documents = postings, documents
+
+    def search(self, query: str) -> List[str]:
+        with self._lock:
+            if self._postings is None:
+                self._build()
+
+        # TF-IDF simples: termos raros pesam mais, repetições têm ganho logarítmico
+        scores: Dict[str, float] = {}
+        for token in set(_tokens(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + self._documents / len(postings))
+            for source, count in postings.items():
+                scores[source] = scores.get(source, 0.0) + (1 + math.log(count)) * idf
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [source for source, _ in ranked[:self.num_results]]
+
+
+def backend_from_env(num_results: int = 2):
+    """WISEIN_SEARCH_BACKEND=local:<pasta> usa o índice local; por omissão, Google."""
+    spec = os.environ.get("WISEIN_SEARCH_BACKEND", "google")
+    if spec.startswith("local:"):
+        return LocalIndexBackend(spec[len("local:"):], num_results=num_results)
+    return GoogleSearchBackend(num_results=num_results)
+
+
+class NewsSearcher:
+    """Pesquisa sem bloquear o event loop (pool de threads limitado) com cache TTL/LRU por query normalizada.
+
+    Pedidos iguais em curso partilham a mesma pesquisa (o Future do pool serve qualquer event loop).
+    """
+
+    def __init__(self, backend=None, max_workers: int = 4, ttl_seconds: float = 3600.0, max_entries: int = 256,
+                 metrics_logger=None):
+        self.backend = backend or GoogleSearchBackend()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.metrics_logger = metrics_logger
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="NewsSearch")
+
+    def _cached(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return results
+
+    def _store(self, key: str, results: List[str]):
+        with self._lock:
+            self._cache[key] = (time.time(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def search(self, query: str) -> List[str]:
+        key = normalize_query(query)
+        results = self._cached(key)
+        if results is not None:
+            self.hits += 1
+            self._report(True)
+            return list(results)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            submitted = future is None
+            if submitted:
+                self.misses += 1
+                future = self._executor.submit(self.backend.search, key)
+                self._in_flight[key] = future
+            else:
+                self.hits += 1
+        if submitted:
+            # Fora do lock: se a pesquisa já acabou, o callback corre já neste thread
+            future.add_done_callback(lambda done: self._finish(key, done))
+        self._report(not submitted)
+        return list(await asyncio.wrap_future(future))
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        # Só resultados bem-sucedidos vão para a cache: uma falha volta a ser tentada
+        if not future.cancelled() and future.exception() is None:
+            self._store(key, list(future.result()))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _report(self, hit: bool):
+        if self.metrics_logger:
+            self.metrics_logger.log_cache_access("news_search", hit)
+
+
+if __name__ == "__main__":
+    import sys
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "."
+    searcher = NewsSearcher(LocalIndexBackend(directory, num_results=3))
+
+    async def demo():
+        for query in ["python asyncio", "  Python   AsyncIO!", "serverless aws lambda"]:
+            start = time.perf_counter()
+            results = await searcher.search(query)
+            print(f"{query!r}: {results} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+
+    asyncio.run(demo())
+    print(f"Hits: {searcher.hits} | Misses: {searcher.misses}")
+    searcher.close()
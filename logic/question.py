@@ -0,0 +1,125 @@
+import sys
+import threading
+from typing import List, Dict, Optional, Any, Iterable
+
+class CodeTable:
+    """Tabela de códigos inteiros pequenos para valores categóricos (valores novos recebem o próximo código)."""
+
+    def __init__(self, values: Iterable[Optional[str]]):
+        self._lock = threading.Lock()
+        self._values: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(value)
+                    self._codes[value] = code
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self._values[code]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+# Os primeiros códigos são fixos: os solvers comparam diretamente com estas constantes
+LEVELS = CodeTable(['easy', 'medium', 'hard'])
+TYPES = CodeTable(['multiple_choice', 'true_false', 'code_completion'])
+CATEGORIES = CodeTable(['vocab', 'grammar'])
+
+EASY, MEDIUM, HARD = 0, 1, 2
+MULTIPLE_CHOICE, TRUE_FALSE, CODE_COMPLETION = 0, 1, 2
+VOCAB, GRAMMAR = 0, 1
+
+class Question:
+    """Registo compacto de uma pergunta: __slots__, tópico internado e códigos inteiros.
+
+    Continua compatível com o formato em dict (q['level'], q.get('type')) usado pela UI.
+    """
+
+    __slots__ = ('id', 'topic', 'level_code', 'type_code', 'category_code')
+
+    def __init__(self, id: int, topic: str, level_code: int = MEDIUM, type_code: int = MULTIPLE_CHOICE,
+                 category_code: int = VOCAB):
+        self.id = id
+        self.topic = sys.intern(topic) if isinstance(topic, str) else topic
+        self.level_code = level_code
+        self.type_code = type_code
+        self.category_code = category_code
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Question":
+        if isinstance(data, Question):
+            return data
+        return cls(
+            data['id'],
+            data.get('topic'),
+            LEVELS.encode(data.get('level')),
+            TYPES.encode(data.get('type')),
+            CATEGORIES.encode(data.get('category')),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'topic': self.topic, 'level': self.level, 'type': self.type, 'category': self.category}
+
+    @property
+    def level(self) -> Optional[str]:
+        return LEVELS.decode(self.level_code)
+
+    @property
+    def type(self) -> Optional[str]:
+        return TYPES.decode(self.type_code)
+
+    @property
+    def category(self) -> Optional[str]:
+        return CATEGORIES.decode(self.category_code)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ('id', 'topic', 'level', 'type', 'category'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Question):
+            return (self.id, self.topic, self.level_code, self.type_code, self.category_code) == \
+                   (other.id, other.topic, other.level_code, other.type_code, other.category_code)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.topic, self.level_code, self.type_code, self.category_code))
+
+    def __getstate__(self):
+        # Envia os valores (não os códigos) para outros processos, onde as tabelas podem diferir
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        other = Question.from_dict(state)
+        for slot in Question.__slots__:
+            setattr(self, slot, getattr(other, slot))
+
+    def __repr__(self) -> str:
+        return f"Question({self.to_dict()!r})"
+
+
+def to_records(pool: Iterable[Dict[str, Any]]) -> List[Question]:
+    return [Question.from_dict(q) for q in pool]
+
+def to_dicts(records: Iterable[Question]) -> List[Dict[str, Any]]:
+    return [q.to_dict() if isinstance(q, Question) else q for q in records]
@@ -0,0 +1,252 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Set, Tuple
+
+try:
+    from logic.question import Question
+except ImportError:
+    from question import Question
+
+DEFAULT_BANK_PATH = os.path.join(".wisein_cache", "question_bank.sqlite")
+
+METADATA_FIELDS = ('id', 'topic', 'level', 'type', 'category')
+KNOWLEDGE_FIELDS = ('q', 'a', 'ok', 'nok')
+
+# IDs gerados começam acima dos IDs estáticos (101, 201, ...)
+MIN_GENERATED_ID = 1000
+
+class QuestionBank:
+    """Banco de perguntas partilhado pelo processo (substitui POOL_ATUAL/DB_PERGUNTAS por sessão).
+
+    As perguntas ficam em SQLite (persistência e partilha entre processos) e em memória, como
+    registos Question, com índices por topic/level/type/category. Leituras são sem cópia do pool; escritas usam um lock.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_BANK_PATH):
+        self.path = path
+        self.version = 0
+        self._lock = threading.RLock()
+        self._questions: Dict[int, Question] = {}
+        self._knowledge: Dict[int, Dict[str, str]] = {}
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {'topic': {}, 'level': {}, 'type': {}, 'category': {}}
+        self._topic_keys: Dict[str, List[str]] = {}
+        self._texts: Set[Tuple[str, str]] = set()
+        self._seq: Dict[int, int] = {}
+        self._last_seq = 0
+        self._next_id = MIN_GENERATED_ID
+        self._last_refresh = time.monotonic()
+
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                # WAL: leitores (refresh) não bloqueiam a escrita de outros processos
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS questions (
+                        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                        id INTEGER NOT NULL UNIQUE,
+                        topic TEXT NOT NULL,
+                        level TEXT,
+                        type TEXT,
+                        category TEXT,
+                        q TEXT, a TEXT, ok TEXT, nok TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions (topic)")
+                # A mesma pergunta (tópico + texto) só pode ser gravada uma vez; limpa repetidos de versões antigas
+                conn.execute(
+                    "DELETE FROM questions WHERE q IS NOT NULL AND seq NOT IN "
+                    "(SELECT MIN(seq) FROM questions WHERE q IS NOT NULL GROUP BY topic, q)"
+                )
+                conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_topic_q ON questions (topic, q)")
+                conn.execute("CREATE TABLE IF NOT EXISTS id_allocator (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)")
+                conn.execute("INSERT OR IGNORE INTO id_allocator (name, next_id) VALUES ('questions', ?)", (MIN_GENERATED_ID,))
+            self.refresh()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _index_question(self, question: Question, knowledge: Optional[Dict[str, str]]):
+        qid = question.id
+        if qid in self._questions:
+            return False
+        text_key = (question.topic, knowledge.get('q')) if knowledge and knowledge.get('q') is not None else None
+        if text_key in self._texts:
+            return False
+        self._questions[qid] = question
+        self._seq[qid] = len(self._seq)
+        if knowledge:
+            self._knowledge[qid] = knowledge
+        if text_key:
+            self._texts.add(text_key)
+        for attr, buckets in self._indexes.items():
+            buckets.setdefault(question.get(attr), []).append(qid)
+        topic = question.get('topic') or ''
+        self._topic_keys.setdefault(topic.lower(), [])
+        if topic not in self._topic_keys[topic.lower()]:
+            self._topic_keys[topic.lower()].append(topic)
+        return True
+
+    def refresh(self) -> int:
+        """Carrega linhas gravadas por outros processos desde a última leitura."""
+        if not self.path:
+            return 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, id, topic, level, type, category, q, a, ok, nok FROM questions WHERE seq > ? ORDER BY seq",
+                (self._last_seq,)
+            ).fetchall()
+
+        added = 0
+        with self._lock:
+            for row in rows:
+                self._last_seq = max(self._last_seq, row[0])
+                question = Question.from_dict(dict(zip(METADATA_FIELDS, row[1:6])))
+                knowledge = dict(zip(KNOWLEDGE_FIELDS, row[6:]))
+                if self._index_question(question, knowledge if knowledge['q'] is not None else None):
+                    added += 1
+            if added:
+                self.version += 1
+        return added
+
+    def add_questions(self, questions: List[Dict[str, Any]]) -> List[Question]:
+        """Acrescenta perguntas (metadados + q/a/ok/nok opcionais); ids ou (tópico, texto) repetidos são ignorados.
+
+        Com SQLite grava primeiro e só indexa as linhas que a base aceitou: se outro processo já gravou
+        o mesmo id ou texto, fica a versão dele (carregada pelo refresh) e a nossa não é devolvida.
+        """
+        with self._lock:
+            candidates = []
+            for item in questions:
+                question = Question.from_dict(item)
+                knowledge = None
+                if isinstance(item, dict):
+                    knowledge = {field: item[field] for field in KNOWLEDGE_FIELDS if field in item} or None
+                text = knowledge.get('q') if knowledge else None
+                if question.id in self._questions or (text is not None and (question.topic, text) in self._texts):
+                    continue
+                candidates.append((question, knowledge))
+
+            if not self.path:
+                added = [q for q, k in candidates if self._index_question(q, k)]
+                if added:
+                    self.version += 1
+                return added
+
+            if not candidates:
+                return []
+            inserted = []
+            with self._connect() as conn:
+                for question, knowledge in candidates:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO questions (id, topic, level, type, category, q, a, ok, nok) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        tuple(question[f] for f in METADATA_FIELDS) + tuple((knowledge or {}).get(f) for f in KNOWLEDGE_FIELDS)
+                    )
+                    if cursor.rowcount == 1:
+                        inserted.append(question.id)
+            # Indexa pela ordem de seq (as nossas linhas e as de outros processos entretanto gravadas); avança _last_seq
+            self.refresh()
+            return [self._questions[qid] for qid in inserted if qid in self._questions]
+
+    def maybe_refresh(self, min_interval: float = 1.0) -> int:
+        """refresh() no máximo uma vez por min_interval segundos (chamado a cada turno da UI)."""
+        now = time.monotonic()
+        if now - self._last_refresh < min_interval:
+            return 0
+        self._last_refresh = now
+        return self.refresh()
+
+    def allocate_ids(self, count: int) -> List[int]:
+        """Reserva `count` IDs únicos e crescentes (seguro entre threads, sessões e processos)."""
+        if count <= 0:
+            return []
+        with self._lock:
+            if not self.path:
+                first = max(self._next_id, max(self._questions, default=0) + 1)
+                self._next_id = first + count
+                return list(range(first, first + count))
+
+            # BEGIN IMMEDIATE pega logo o lock de escrita: ler e avançar o contador é atómico entre processos
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "UPDATE id_allocator SET next_id = MAX(next_id, (SELECT COALESCE(MAX(id), 0) + 1 FROM questions)) + ? "
+                    "WHERE name = 'questions'",
+                    (count,)
+                )
+                (next_id,) = conn.execute("SELECT next_id FROM id_allocator WHERE name = 'questions'").fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+            return list(range(next_id - count, next_id))
+
+    def seed(self, pool: List[Dict[str, Any]], knowledge: Dict[int, Dict[str, str]]):
+        self.add_questions([dict(q, **knowledge.get(q['id'], {})) for q in pool])
+
+    def get(self, question_id: int) -> Optional[Question]:
+        return self._questions.get(question_id)
+
+    def get_knowledge(self, question_id: int) -> Optional[Dict[str, str]]:
+        return self._knowledge.get(question_id)
+
+    def all(self) -> List[Question]:
+        with self._lock:
+            return list(self._questions.values())
+
+    def query(self, **filters) -> List[Question]:
+        """Interseção dos índices (igualdade exata), ex.: query(topic='python', level='hard')."""
+        with self._lock:
+            if not filters:
+                return self.all()
+            id_lists = [self._indexes[attr].get(value, []) for attr, value in filters.items()]
+            id_lists.sort(key=len)
+            ids = id_lists[0]
+            for other in id_lists[1:]:
+                other_set = set(other)
+                ids = [qid for qid in ids if qid in other_set]
+            return [self._questions[qid] for qid in ids]
+
+    def search_topic(self, topic: str) -> List[Question]:
+        """Mesma regra da UI (`topic.lower() in q['topic'].lower()`), mas percorre só os tópicos distintos."""
+        needle = topic.lower()
+        with self._lock:
+            topics = [t for key, names in self._topic_keys.items() if needle in key for t in names]
+            ids = [qid for t in topics for qid in self._indexes['topic'].get(t, [])]
+            if len(topics) > 1:
+                ids.sort(key=self._seq.__getitem__)
+            return [self._questions[qid] for qid in ids]
+
+    def has_topic(self, topic: str) -> bool:
+        needle = topic.lower()
+        with self._lock:
+            return any(needle in key for key in self._topic_keys)
+
+    def contains(self, topic: str, text: str) -> bool:
+        """Já existe uma pergunta com este tópico e este texto?"""
+        with self._lock:
+            return (topic, text) in self._texts
+
+    def topics(self) -> List[str]:
+        """Nomes distintos dos tópicos (vocabulário do router local)."""
+        with self._lock:
+            return [t for names in self._topic_keys.values() for t in names]
+
+    def __len__(self) -> int:
+        return len(self._questions)
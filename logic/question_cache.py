@@ -0,0 +1,94 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any
+
+DEFAULT_CACHE_PATH = os.path.join(".wisein_cache", "questions.sqlite")
+
+class QuestionBatchCache:
+    """Cache persistente (SQLite) dos lotes de perguntas gerados pelo LLM.
+
+    Chave = tópico normalizado + versão do prompt. Entradas expiram após ttl_seconds e,
+    acima de max_entries, as menos usadas recentemente são removidas.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 500):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS question_batches (
+                    topic TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (topic, prompt_version)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_batches_last_access ON question_batches (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # Uma ligação por operação: seguro entre threads/sessões do Streamlit
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def normalize_topic(topic: str) -> str:
+        return " ".join(topic.lower().split())
+
+    def get(self, topic: str, prompt_version: str) -> Optional[List[Dict[str, Any]]]:
+        key = self.normalize_topic(topic)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM question_batches WHERE topic = ? AND prompt_version = ?",
+                (key, prompt_version)
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM question_batches WHERE topic = ? AND prompt_version = ?", (key, prompt_version))
+                return None
+
+            conn.execute(
+                "UPDATE question_batches SET last_access = ? WHERE topic = ? AND prompt_version = ?",
+                (now, key, prompt_version)
+            )
+        return json.loads(payload)
+
+    def put(self, topic: str, prompt_version: str, questions: List[Dict[str, Any]]):
+        key = self.normalize_topic(topic)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO question_batches (topic, prompt_version, payload, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, prompt_version, json.dumps(questions, ensure_ascii=False), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM question_batches WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute("""
+            DELETE FROM question_batches WHERE rowid IN (
+                SELECT rowid FROM question_batches ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM question_batches")
@@ -0,0 +1,67 @@
+import json
+from typing import List, Dict, Any, AsyncIterator
+
+class IncrementalQuestionParser:
+    """Extrai objetos JSON de topo à medida que o texto do modelo chega.
+
+    Ignora o que estiver fora dos objetos (```json, '[', vírgulas, texto de introdução),
+    por isso cada pergunta fica disponível assim que a sua '}' final chega.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buffer += chunk
+        buf = self._buffer
+        completed = []
+
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth > 0:
+                self._in_string = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        item = json.loads(buf[self._obj_start:i + 1])
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        completed.append(item)
+            i += 1
+
+        # Só guarda o objeto ainda incompleto
+        if self._depth > 0:
+            self._buffer = buf[self._obj_start:]
+            self._pos = len(self._buffer)
+            self._obj_start = 0
+        else:
+            self._buffer = ""
+            self._pos = 0
+        return completed
+
+
+async def stream_questions(chunks: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Converte um stream de tokens num stream de perguntas (dicts) completas."""
+    parser = IncrementalQuestionParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
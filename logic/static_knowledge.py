@@ -0,0 +1,19 @@
+# Base de Conhecimento interna (Modo Offline); semeia o QuestionBank uma vez por processo
+
+STATIC_KNOWLEDGE = {
+    101: {"q": "Qual keyword define uma função em Python?", "a": "def", "ok": "Correto!", "nok": "Errado. É 'def'."},
+    102: {"q": "Listas são mutáveis ou imutáveis?", "a": "mutáveis", "ok": "Certo!", "nok": "Errado."},
+    103: {"q": "O que é o GIL?", "a": "global interpreter lock", "ok": "Exato!", "nok": "Global Interpreter Lock."},
+    104: {"q": "Python é compilado estaticamente?", "a": "não", "ok": "Certo.", "nok": "Errado."},
+    105: {"q": "Complete: `___ : try code` ... `except:`", "a": "try", "ok": "Perfeito.", "nok": "É 'try'."},
+    201: {"q": "Serviço Serverless da AWS?", "a": "lambda", "ok": "Correto.", "nok": "É o Lambda."}
+}
+
+STATIC_POOL = [
+    {'id': 101, 'topic': 'python', 'level': 'easy', 'type': 'multiple_choice', 'category': 'vocab'},
+    {'id': 102, 'topic': 'python', 'level': 'medium', 'type': 'multiple_choice', 'category': 'vocab'},
+    {'id': 103, 'topic': 'python', 'level': 'hard', 'type': 'multiple_choice', 'category': 'vocab'},
+    {'id': 104, 'topic': 'python', 'level': 'medium', 'type': 'true_false', 'category': 'vocab'},
+    {'id': 105, 'topic': 'python', 'level': 'hard', 'type': 'code_completion', 'category': 'grammar'},
+    {'id': 201, 'topic': 'AWS', 'level': 'hard', 'type': 'multiple_choice', 'category': 'vocab'},
+]
@@ -0,0 +1,147 @@
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+DEFAULT_TRACE_PATH = os.path.join(".wisein_cache", "traces.jsonl")
+
+# Marca um turno não amostrado: os spans filhos saem logo, sem alocar nada
+_UNSAMPLED = object()
+_current_span: ContextVar = ContextVar("wisein_current_span", default=None)
+
+class _Trace:
+    __slots__ = ('trace_id', 'spans', 'lock')
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start', 'duration', 'error')
+
+    def __init__(self, trace: _Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    """Spans com pai/filho via contextvars; cada turno amostrado vira uma linha JSONL com a árvore de spans.
+
+    A amostragem é decidida no span raiz, por isso um turno é gravado inteiro ou não é gravado.
+    Só spans com root=True (o turno) abrem um trace; os restantes sem pai ativo não fazem nada.
+    """
+
+    def __init__(self, path: str = DEFAULT_TRACE_PATH, sample_rate: float = 0.05):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes):
+        parent = _current_span.get()
+        if parent is _UNSAMPLED or (parent is None and not root):
+            # Turno não amostrado, ou código de biblioteca chamado fora de um turno (demo, workers, prefetch)
+            yield None
+            return
+
+        if parent is None:
+            if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+                token = _current_span.set(_UNSAMPLED)
+                try:
+                    yield None
+                finally:
+                    _current_span.reset(token)
+                return
+            trace, parent_id = _Trace(), None
+        else:
+            trace, parent_id = parent.trace, parent.span_id
+
+        span = Span(trace, name, parent_id, attributes)
+        start = time.perf_counter()
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            with trace.lock:
+                trace.spans.append(span.to_dict())
+            if parent_id is None:
+                self._write(trace, span)
+
+    def _write(self, trace: _Trace, root: Span):
+        record = {
+            "trace_id": trace.trace_id,
+            "root": root.name,
+            "start": root.start,
+            "duration_ms": round(root.duration * 1000, 3),
+            "spans": sorted(trace.spans, key=lambda s: s["start"]),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        directory = os.path.dirname(self.path)
+        with self._write_lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+TRACER = Tracer(
+    path=os.environ.get("WISEIN_TRACE_FILE", DEFAULT_TRACE_PATH),
+    sample_rate=float(os.environ.get("WISEIN_TRACE_SAMPLE_RATE", "0.05")),
+)
+
+def current_span() -> Optional[Span]:
+    span = _current_span.get()
+    return None if span is _UNSAMPLED else span
+
+def traced(name: Optional[str] = None, tracer: Optional[Tracer] = None, root: bool = False):
+    """Decorador: corre a função (sync ou async) dentro de um span (filho do span ativo, ou raiz se root=True)."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with (tracer or TRACER).span(span_name, root=root):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with (tracer or TRACER).span(span_name, root=root):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
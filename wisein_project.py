@@ -1,9 +1,7 @@
 import asyncio
+import os
 import sys
 import time
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from googlesearch import search
 from typing import List, Dict, Optional
 
 try:
@@ -11,23 +9,31 @@ try:
         from logic.csp_quiz import QuizCSP
         from logic.adversarial import InterviewGame
         from logic.metrics import MetricsLogger
+        from logic.llm_client import get_client_manager, shutdown_client_managers
+        from logic.news_search import NewsSearcher, backend_from_env
+        from logic.intent_router import IntentRouter, QUIZ, INTERVIEW, NEWS
     except ImportError:
         from logic.csp_quiz import QuizCSP
         from logic.adversarial import InterviewGame
         from logic.metrics import MetricsLogger
+        from logic.llm_client import get_client_manager, shutdown_client_managers
+        from logic.news_search import NewsSearcher, backend_from_env
+        from logic.intent_router import IntentRouter, QUIZ, INTERVIEW, NEWS
 
     metrics_logger = MetricsLogger()
+    news_searcher = NewsSearcher(backend_from_env(), metrics_logger=metrics_logger)
+    intent_router = IntentRouter()
     print("[SYSTEM] Módulos de Lógica (CSP/Adversarial) carregados.")
 except ImportError as e:
     print(f"[ERRO CRÍTICO] Não foi possível carregar a lógica: {e}")
     sys.exit(1)
 
-OPENROUTER_API_KEY = " " # <--- INSERE A CHAVE AQUI
+OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", " ") # <--- INSERE A CHAVE AQUI
 
 CLIENT_CONFIG = {
     "model": "openai/gpt-4o-mini",
     "api_key": OPENROUTER_API_KEY,
-    "base_url": "https://openrouter.ai/api/v1",
+    "base_url": os.environ.get("WISEIN_LLM_BASE_URL", "https://openrouter.ai/api/v1"),
     "model_info": {
         "vision": False, 
         "function_calling": True, 
@@ -84,9 +90,10 @@ async def next_adversarial_move(last_answer: str) -> str:
 async def search_news(query: str) -> str:
     """Ferramenta RAG Simples."""
     try:
-        res = list(search(query, num_results=2, lang="en"))
+        # Corre num thread (não bloqueia o loop) e repete queries servidas da cache
+        res = await news_searcher.search(query)
         return f"LINKS ENCONTRADOS: {res}"
-    except:
+    except Exception:
         return "FALHA NA BUSCA: API Google indisponível."
 
 async def run_wisein_demo(user_input: str):
@@ -94,43 +101,45 @@ async def run_wisein_demo(user_input: str):
     print(f" WISEIN SYSTEM | Input: '{user_input}'")
     print(f"{'='*60}\n")
 
-    client = OpenAIChatCompletionClient(**CLIENT_CONFIG)
-
-    assessor = AssistantAgent(
-        name="Assessor", model_client=client, tools=[generate_quiz_plan],
-        system_message="Tu és o Assessor. Usa 'generate_quiz_plan'."
-    )
-    tutor = AssistantAgent(
-        name="Tutor", model_client=client, tools=[next_adversarial_move],
-        system_message="Tu és o Tutor. Usa 'next_adversarial_move'."
-    )
-    curator = AssistantAgent(
-        name="Curador", model_client=client, tools=[search_news],
-        system_message="Tu és o Curador. Usa 'search_news'."
-    )
+    llm = get_client_manager(CLIENT_CONFIG)
+
+    assessor = {
+        "name": "Assessor", "tools": [generate_quiz_plan],
+        "system_message": "Tu és o Assessor. Usa 'generate_quiz_plan'."
+    }
+    tutor = {
+        "name": "Tutor", "tools": [next_adversarial_move],
+        "system_message": "Tu és o Tutor. Usa 'next_adversarial_move'."
+    }
+    curator = {
+        "name": "Curador", "tools": [search_news],
+        "system_message": "Tu és o Curador. Usa 'search_news'."
+    }
 
     active_agent = tutor 
     tool_to_force = None
 
-    if "quiz" in user_input.lower() or "plano" in user_input.lower():
+    intent = intent_router.route(user_input)["intent"]
+
+    if intent == QUIZ:
         print(">> ROUTER: Redirecionando para o Agente ASSESSOR (CSP)...")
         active_agent = assessor
         tool_to_force = generate_quiz_plan
     
-    elif "entrevista" in user_input.lower() or "pergunta" in user_input.lower():
+    elif intent == INTERVIEW:
         print(">> ROUTER: Redirecionando para o Agente TUTOR (Adversarial)...")
         active_agent = tutor
         tool_to_force = next_adversarial_move
     
-    elif "notícia" in user_input.lower():
+    elif intent == NEWS:
         print(">> ROUTER: Redirecionando para o Agente CURADOR (RAG)...")
         active_agent = curator
         tool_to_force = search_news
 
     try:
-        result = await active_agent.run(task=user_input)
+        result = await llm.run_agent(task=user_input, **active_agent)
         print("\n" + "-"*30)
-        print(f"RESPOSTA DO AGENTE ({active_agent.name}):")
+        print(f"RESPOSTA DO AGENTE ({active_agent['name']}):")
         print("-" * 30)
         print(result.messages[-1].content)
         print("-" * 30)
@@ -156,8 +165,6 @@ async def run_wisein_demo(user_input: str):
         else:
             print("Não foi possível determinar qual ferramenta executar.")
 
-    await client.close()
-
 
 if __name__ == "__main__":
     try:
@@ -175,4 +182,5 @@ if __name__ == "__main__":
         asyncio.run(run_wisein_demo("Estou pronto para a entrevista"))
     except Exception as e:
         print(f"Erro no Teste 2: {e}")
-    
\ No newline at end of file
+
+    shutdown_client_managers()